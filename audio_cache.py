@@ -0,0 +1,221 @@
+# audio_cache.py
+# Caché en disco del audio servido por /songs/{id}/stream.
+#
+# Los archivos se descargan del origen (Cloudinary, o un directorio local en
+# pruebas) una sola vez aunque lleguen muchas peticiones a la vez, se guardan
+# en STREAM_CACHE_DIR y se sirven con FileResponse (Range/206 y, si el servidor
+# ASGI lo ofrece, envío zero-copy con la extensión pathsend). El tamaño total
+# está acotado: se expulsan los archivos usados hace más tiempo.
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from fastapi.concurrency import run_in_threadpool
+
+STREAM_CACHE_DIR = os.getenv("STREAM_CACHE_DIR", "./audio_cache")
+STREAM_CACHE_MAX_BYTES = int(os.getenv("STREAM_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# "http" (Cloudinary u otra URL) o "local": los archivos salen de STREAM_ORIGIN_DIR
+STREAM_ORIGIN = os.getenv("STREAM_ORIGIN", "http")
+STREAM_ORIGIN_DIR = os.getenv("STREAM_ORIGIN_DIR", "./media")
+ORIGIN_TIMEOUT = float(os.getenv("STREAM_ORIGIN_TIMEOUT", "30"))
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class OriginError(Exception):
+    pass
+
+
+def _copy_file_url(url: str, dest) -> bool:
+    """Las URL file:// (LocalUploader) se leen directamente."""
+    if not url.startswith("file://"):
+        return False
+    with open(unquote(urlparse(url).path), "rb") as src:
+        shutil.copyfileobj(src, dest, COPY_CHUNK_SIZE)
+    return True
+
+
+class HttpOrigin:
+    def fetch(self, url: str, dest) -> None:
+        try:
+            if _copy_file_url(url, dest):
+                return
+            with urllib.request.urlopen(url, timeout=ORIGIN_TIMEOUT) as response:
+                shutil.copyfileobj(response, dest, COPY_CHUNK_SIZE)
+        except OSError as e:
+            raise OriginError(f"{url}: {e}") from e
+
+
+class LocalOrigin:
+    """Sustituye a Cloudinary: busca por nombre de archivo en un directorio."""
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+
+    def fetch(self, url: str, dest) -> None:
+        try:
+            if _copy_file_url(url, dest):
+                return
+            name = os.path.basename(unquote(urlparse(url).path))
+            with open(os.path.join(self.directory, name), "rb") as src:
+                shutil.copyfileobj(src, dest, COPY_CHUNK_SIZE)
+        except OSError as e:
+            raise OriginError(f"{url}: {e}") from e
+
+
+_origin = None
+
+
+def get_origin():
+    global _origin
+    if _origin is None:
+        _origin = LocalOrigin(STREAM_ORIGIN_DIR) if STREAM_ORIGIN == "local" else HttpOrigin()
+    return _origin
+
+
+def set_origin(origin) -> None:
+    """Sustituye el origen (p. ej. un LocalOrigin en pruebas)."""
+    global _origin
+    _origin = origin
+
+
+class DiskLRU:
+    """
+    Índice en memoria (clave -> tamaño, en orden de uso) de los archivos del
+    directorio. Los archivos que se están enviando están "prestados" y no se
+    expulsan hasta que se devuelven.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total = 0
+        self.leases = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        """Recupera lo que ya hubiera en disco, del más antiguo al más reciente."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                st = entry.stat()
+                files.append((st.st_atime, entry.name, st.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.total += size
+        self._evict()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        ext = os.path.splitext(urlparse(url).path)[1][:8]
+        return hashlib.sha256(url.encode()).hexdigest()[:32] + ext
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _evict(self) -> None:
+        for key in list(self.entries):
+            if self.total <= self.max_bytes:
+                break
+            if self.leases.get(key):
+                continue
+            self.total -= self.entries.pop(key)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def lease(self, key: str) -> Optional[str]:
+        """Ruta del archivo si está en caché, marcándolo como usado y prestado."""
+        with self._lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            self.leases[key] = self.leases.get(key, 0) + 1
+            return self.path(key)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            n = self.leases.get(key, 0) - 1
+            if n > 0:
+                self.leases[key] = n
+            else:
+                self.leases.pop(key, None)
+                self._evict()
+
+    def _store(self, key: str, tmp_path: str) -> None:
+        os.replace(tmp_path, self.path(key))
+        with self._lock:
+            self.total += os.path.getsize(self.path(key)) - self.entries.pop(key, 0)
+            self.entries[key] = os.path.getsize(self.path(key))
+            self._evict()
+
+    def _fetch_sync(self, key: str, url: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as dest:
+                get_origin().fetch(url, dest)
+            self._store(key, tmp_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    async def acquire(self, url: str):
+        """
+        Devuelve (clave, ruta) con el archivo prestado; hay que llamar a
+        release(clave) al terminar de enviarlo. Si no está en caché se descarga
+        una sola vez: las peticiones simultáneas esperan a la misma descarga.
+        """
+        key = self.key_for(url)
+        for _ in range(2):
+            path = self.lease(key)
+            if path is not None:
+                self.hits += 1
+                return key, path
+            self.misses += 1
+            task = self._inflight.get(key)
+            if task is None:
+                self.fetches += 1
+                task = asyncio.ensure_future(run_in_threadpool(self._fetch_sync, key, url))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # shield: si este cliente se desconecta, la descarga sigue para los demás
+            await asyncio.shield(task)
+        # Sólo ocurre si el archivo por sí solo no cabe en la caché
+        raise OriginError(f"{url}: no cabe en la caché ({self.max_bytes} bytes)")
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self.entries),
+            "bytes": self.total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "origin_fetches": self.fetches,
+        }
+
+
+_cache = None
+
+
+def get_audio_cache() -> DiskLRU:
+    global _cache
+    if _cache is None:
+        _cache = DiskLRU(STREAM_CACHE_DIR, STREAM_CACHE_MAX_BYTES)
+    return _cache
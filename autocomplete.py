@@ -0,0 +1,273 @@
+# autocomplete.py
+# Sugerencias "search-as-you-type" servidas desde memoria.
+#
+# Cada nombre (canción, álbum, artista) se indexa por el comienzo de cada una de
+# sus palabras en un array ordenado de claves; un prefijo es un rango contiguo que
+# se localiza con bisect. Los resultados se ordenan por likes (like_counts).
+# Los prefijos cortos cubren rangos enormes ("a", "th"...): para ellos el mejor
+# TOP_K de cada tipo se calcula al cargar y se mantiene con add() y bump().
+import heapq
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from sqlalchemy import func, select
+
+from database import AsyncSessionLocal
+from models import LikeCount, Song, Album, Artist
+from search import tokenize
+
+AUTOCOMPLETE_MAX_ITEMS = int(os.getenv("AUTOCOMPLETE_MAX_ITEMS", "500000"))
+MAX_KEY_LENGTH = 64          # las claves se truncan: acota la memoria por nombre
+SCAN_LIMIT = 2000            # rangos mayores se resuelven una vez y se memorizan
+TOP_PREFIX_LENGTH = 3        # prefijos hasta esta longitud con rango ancho: top-k precalculado
+TOP_K = 50                   # también el máximo de `limit` en /autocomplete
+MEMO_SIZE = 1024
+MEMO_TTL = 5.0               # segundos; los likes cambian el orden sin invalidar
+SECONDARY_WORD = 0.8         # coincidencia en una palabra que no es la primera
+TYPO_PENALTY = 0.5
+MIN_TYPO_LENGTH = 4
+TYPO_SCAN_BUDGET = 10000     # entradas recorridas como mucho entre todas las variantes
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 "
+
+# tipo -> (modelo, columna con el nombre)
+AUTOCOMPLETE_SOURCES = {
+    "song": (Song, "title"),
+    "album": (Album, "title"),
+    "artist": (Artist, "name"),
+}
+
+
+def _keys_for(text: str):
+    """Clave por cada palabra: "the beatles" -> "the beatles", "beatles"."""
+    words = tokenize(text)
+    for i in range(len(words)):
+        yield " ".join(words[i:])[:MAX_KEY_LENGTH], i == 0
+
+
+def _one_edit_variants(prefix: str):
+    """
+    Prefijos a una errata: borrado, trasposición, sustitución o inserción. Se
+    generan de uno en uno (en orden estable) para poder parar en cuanto basten.
+    """
+    seen = {prefix}
+    for i in range(len(prefix)):
+        candidates = [prefix[:i] + prefix[i + 1:]]
+        if i + 1 < len(prefix):
+            candidates.append(prefix[:i] + prefix[i + 1] + prefix[i] + prefix[i + 2:])
+        for c in _ALPHABET:
+            candidates.append(prefix[:i] + c + prefix[i + 1:])
+            # Letra que falta ("somthing"); al final no hace falta: ya es un prefijo
+            candidates.append(prefix[:i] + c + prefix[i:])
+        for variant in candidates:
+            if variant not in seen and variant.strip():
+                seen.add(variant)
+                yield variant
+
+
+class PrefixIndex:
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.keys: List[str] = []
+        self.refs = array("l")     # ref * 2 + (1 si es la primera palabra)
+        self.items: List[list] = []  # ref -> [tipo, id, texto, likes]
+        self.by_item = {}
+        self._memo = OrderedDict()
+        self._top = {}             # (prefijo, tipo) -> {ref: peso de la palabra}
+        self._lock = threading.RLock()
+
+    def _new_item(self, item_type: str, item_id: int, text: str, likes: int) -> Optional[int]:
+        if (item_type, item_id) in self.by_item or len(self.items) >= self.max_items or not text:
+            return None
+        ref = len(self.items)
+        self.items.append([item_type, item_id, text, likes])
+        self.by_item[(item_type, item_id)] = ref
+        return ref
+
+    def load(self, rows) -> None:
+        """Carga masiva: (tipo, id, texto, likes) ordenados por likes desc. Ordena una sola vez."""
+        pairs = []
+        with self._lock:
+            for item_type, item_id, text, likes in rows:
+                ref = self._new_item(item_type, item_id, text, likes or 0)
+                if ref is not None:
+                    pairs.extend((key, ref * 2 + primary) for key, primary in _keys_for(text))
+            pairs.extend(zip(self.keys, self.refs))
+            pairs.sort()
+            self.keys = [k for k, _ in pairs]
+            self.refs = array("l", (r for _, r in pairs))
+            self._memo.clear()
+            self._precompute()
+
+    def _score(self, ref: int, weight: float) -> float:
+        return (self.items[ref][3] + 1) * weight
+
+    def _precompute(self) -> None:
+        """Top-k por tipo de cada prefijo de hasta TOP_PREFIX_LENGTH caracteres con rango ancho."""
+        self._top = {}
+        kinds = [item[0] for item in self.items]
+        base = [item[3] + 1 for item in self.items]
+        for length in range(1, TOP_PREFIX_LENGTH + 1):
+            i = 0
+            while i < len(self.keys):
+                prefix = self.keys[i][:length]
+                if len(prefix) < length:
+                    i += 1
+                    continue
+                hi = bisect_left(self.keys, prefix + "\uffff", i)
+                if hi - i > SCAN_LIMIT:
+                    # Comprensiones en lugar de un bucle: esto recorre el índice entero por nivel
+                    segment = self.refs[i:hi]
+                    weights = {r >> 1: SECONDARY_WORD for r in segment if not r & 1}
+                    weights.update((r >> 1, 1.0) for r in segment if r & 1)
+                    for item_type in AUTOCOMPLETE_SOURCES:
+                        scored = [(base[ref] * w, ref, w) for ref, w in weights.items() if kinds[ref] == item_type]
+                        self._top[(prefix, item_type)] = {ref: w for _, ref, w in heapq.nlargest(TOP_K, scored)}
+                i = hi
+
+    def _promote(self, ref: int) -> None:
+        """Tras un alta o un like: entra en los top-k precalculados de sus prefijos si le corresponde."""
+        item_type, _, text, _ = self.items[ref]
+        for key, primary in _keys_for(text):
+            weight = 1.0 if primary else SECONDARY_WORD
+            for length in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1):
+                top = self._top.get((key[:length], item_type))
+                if top is None or top.get(ref, 0.0) >= weight:
+                    continue
+                if ref not in top and len(top) >= TOP_K:
+                    worst = min(top, key=lambda r: self._score(r, top[r]))
+                    if self._score(worst, top[worst]) >= self._score(ref, weight):
+                        continue
+                    del top[worst]
+                top[ref] = weight
+
+    def add(self, item_type: str, item_id: int, text: str) -> None:
+        """Alta incremental desde los endpoints de creación."""
+        with self._lock:
+            ref = self._new_item(item_type, item_id, text, 0)
+            if ref is None:
+                return
+            for key, primary in _keys_for(text):
+                i = bisect_left(self.keys, key)
+                self.keys.insert(i, key)
+                self.refs.insert(i, ref * 2 + primary)
+            self._memo.clear()
+            self._promote(ref)
+
+    def bump(self, item_type: str, item_id: int, delta: int) -> None:
+        with self._lock:
+            ref = self.by_item.get((item_type, item_id))
+            if ref is not None:
+                self.items[ref][3] += delta
+                if delta > 0:
+                    self._promote(ref)
+
+    def _bounds(self, prefix: str):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + "\uffff")
+
+    def _memoized(self, memo_key):
+        cached = self._memo.get(memo_key)
+        if cached and cached[0] > time.monotonic():
+            self._memo.move_to_end(memo_key)
+            return cached[1]
+        return None
+
+    def _precomputed(self, prefix: str, k: int, types: Sequence[str]):
+        """Top-k desde los precalculados, con los likes actuales; None si el prefijo no está."""
+        tops = [self._top.get((prefix, t)) for t in types]
+        if any(top is None for top in tops):
+            return None
+        scored = ((ref, self._score(ref, w)) for top in tops for ref, w in top.items())
+        return heapq.nlargest(k, scored, key=lambda kv: kv[1])
+
+    def _range_top(self, prefix: str, k: int, types: Sequence[str]):
+        lo, hi = self._bounds(prefix)
+        memo_key = (prefix, tuple(types), k)
+        if hi - lo > SCAN_LIMIT:
+            cached = self._precomputed(prefix, k, types) if k <= TOP_K else None
+            if cached is None:
+                cached = self._memoized(memo_key)
+            if cached is not None:
+                return cached
+        top = self._scan(lo, hi, k, types)
+        if hi - lo > SCAN_LIMIT:
+            self._memo[memo_key] = (time.monotonic() + MEMO_TTL, top)
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return top
+
+    def _scan(self, lo: int, hi: int, k: int, types: Sequence[str]):
+        best = {}
+        for i in range(lo, hi):
+            ref, primary = divmod(self.refs[i], 2)
+            item = self.items[ref]
+            if item[0] not in types:
+                continue
+            score = (item[3] + 1) * (1.0 if primary else SECONDARY_WORD)
+            if score > best.get(ref, 0.0):
+                best[ref] = score
+        return heapq.nlargest(k, best.items(), key=lambda kv: kv[1])
+
+    def _typo_top(self, prefix: str, k: int, types: Sequence[str]):
+        """
+        Resultados de las variantes a una errata. Sólo bisect para descartar las
+        vacías; los rangos anchos (borrados en prefijos cortos) se usan si ya están
+        memorizados y el resto se recorre hasta TYPO_SCAN_BUDGET entradas, para
+        que una consulta con erratas no bloquee el lock ni el event loop.
+        """
+        budget = TYPO_SCAN_BUDGET
+        for variant in _one_edit_variants(prefix):
+            lo, hi = self._bounds(variant)
+            if hi == lo:
+                continue
+            if hi - lo > SCAN_LIMIT:
+                yield from self._precomputed(variant, k, types) or self._memoized((variant, tuple(types), k)) or ()
+                continue
+            if hi - lo > budget:
+                continue
+            budget -= hi - lo
+            yield from self._scan(lo, hi, k, types)
+
+    def complete(self, text: str, k: int, types: Sequence[str]) -> List[dict]:
+        # Las claves están truncadas a MAX_KEY_LENGTH: más allá no hay nada que comparar
+        prefix = " ".join(tokenize(text))[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        with self._lock:
+            scores = dict(self._range_top(prefix, k, types))
+            if len(scores) < k and len(prefix) >= MIN_TYPO_LENGTH:
+                for ref, score in self._typo_top(prefix, k, types):
+                    scores.setdefault(ref, score * TYPO_PENALTY)
+                    if len(scores) >= k:
+                        break
+            top = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+            return [
+                {"type": t, "id": i, "text": name, "likes": likes}
+                for t, i, name, likes in (self.items[ref] for ref, _ in top)
+            ]
+
+    async def build(self) -> None:
+        """Construye el índice desde la BD, empezando por lo más popular."""
+        rows = []
+        for item_type, (model, column) in AUTOCOMPLETE_SOURCES.items():
+            likes = func.coalesce(LikeCount.count, 0)
+            stmt = (
+                select(model.id, getattr(model, column), likes)
+                .outerjoin(LikeCount, (LikeCount.item_type == item_type) & (LikeCount.item_id == model.id))
+                .order_by(likes.desc())
+                .limit(self.max_items)
+                .execution_options(yield_per=5000)
+            )
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(stmt)
+                async for batch in result.partitions():
+                    rows.extend((item_type, item_id, text, n) for item_id, text, n in batch)
+        rows.sort(key=lambda r: r[3], reverse=True)
+        self.load(rows)
+
+
+autocomplete_index = PrefixIndex(AUTOCOMPLETE_MAX_ITEMS)
@@ -0,0 +1,259 @@
+# bench/load.py
+# Prueba de carga: clientes concurrentes recorriendo todos los routers con una
+# mezcla ponderada de peticiones. Informa p50/p95/p99 por escenario, throughput
+# y pico de RSS, y compara con un baseline.
+#
+#   python -m bench.seed --preset small
+#   python -m bench.load --duration 30 --concurrency 32
+#   python -m bench.load --save-baseline bench/baseline.json
+#   python -m bench.load --baseline bench/baseline.json      (sale con 1 si hay regresión)
+#   python -m bench.load --url http://localhost:8000         (servidor ya arrancado)
+#
+# Por defecto la app corre en este mismo proceso (httpx + ASGITransport): sin
+# red ni uvicorn, así que mide el coste de la aplicación y de la BD.
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("UPLOAD_BACKEND", "local")          # nada de Cloudinary
+os.environ.setdefault("UPLOAD_LOCAL_DIR", "./bench_media")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from database import SessionLocal  # noqa: E402
+from models import UserDB, Artist, Album, Song, Playlist  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+from bench.seed import BENCH_PASSWORD, WORDS  # noqa: E402
+
+AUDIO_BYTES = os.urandom(64 * 1024)
+
+
+def _volumes() -> dict:
+    with SessionLocal() as db:
+        return {
+            name: db.scalar(select(func.max(model.id))) or 0
+            for name, model in (("users", UserDB), ("artists", Artist), ("albums", Album),
+                                ("songs", Song), ("playlists", Playlist))
+        }
+
+
+class Scenarios:
+    """Cada escenario es (nombre, peso, corrutina). Los pesos imitan una app de streaming: casi todo lecturas."""
+
+    def __init__(self, volumes: dict, rng: random.Random):
+        self.v = volumes
+        self.rng = rng
+        self._new_users = itertools.count()
+
+    def _id(self, kind: str) -> int:
+        return self.rng.randint(1, max(1, self.v[kind]))
+
+    def table(self):
+        return [
+            ("songs.list", 8, lambda c: c.get("/songs/songs", params={"limit": 50, "cursor": encode_cursor(self._id("songs"))})),
+            ("songs.get", 12, lambda c: c.get(f"/songs/{self._id('songs')}")),
+            ("songs.create", 1, self.create_song),
+            ("albums.list", 4, lambda c: c.get("/albums/", params={"limit": 50})),
+            ("albums.get", 6, lambda c: c.get(f"/albums/{self._id('albums')}")),
+            ("albums.expand", 6, lambda c: c.get(f"/albums/{self._id('albums')}", params={"expand": "songs"})),
+            ("artists.list", 3, lambda c: c.get("/artists/", params={"limit": 50})),
+            ("artists.get", 4, lambda c: c.get(f"/artists/{self._id('artists')}")),
+            ("artists.expand", 4, lambda c: c.get(f"/artists/{self._id('artists')}", params={"expand": "albums,songs"})),
+            ("users.list", 2, lambda c: c.get("/users/", params={"limit": 50})),
+            ("users.get", 3, lambda c: c.get(f"/users/{self._id('users')}")),
+            ("users.create", 1, self.create_user),
+            ("users.login", 1, lambda c: c.post("/users/login", json={"email": f"user{self._id('users')}@bench.local", "password": BENCH_PASSWORD})),
+            ("playlists.get", 8, lambda c: c.get(f"/playlists/{self._id('playlists')}", params={"limit": 100})),
+            ("playlists.get_large", 2, lambda c: c.get("/playlists/1", params={"offset": self.rng.randint(0, 9000), "limit": 100, "include": "artist,album"})),
+            ("playlists.add_songs", 2, lambda c: c.post(f"/playlists/{self._id('playlists')}/songs", json={"song_ids": [self._id("songs") for _ in range(5)]})),
+            ("likes.toggle", 6, lambda c: c.post(f"/users/{self._id('users')}/like/song/{self._id('songs')}")),
+            ("likes.profile", 5, lambda c: c.get(f"/users/{self._id('users')}/likes", params={"limit": 50})),
+            ("charts.top", 3, lambda c: c.get("/charts/top/song", params={"limit": 50})),
+            ("search", 5, lambda c: c.get("/search", params={"q": " ".join(self.rng.sample(WORDS, 2))})),
+            ("autocomplete", 8, lambda c: c.get("/autocomplete", params={"q": self.rng.choice(WORDS)[:self.rng.randint(2, 5)]})),
+        ]
+
+    def create_song(self, c):
+        return c.post("/songs/songs", data={"title": "Bench " + self.rng.choice(WORDS), "duration": "3:00",
+                                            "album_id": self._id("albums"), "artist_id": self._id("artists")},
+                      files={"audio": ("bench.mp3", AUDIO_BYTES, "audio/mpeg")})
+
+    def create_user(self, c):
+        n = f"{os.getpid()}-{time.time_ns()}-{next(self._new_users)}"
+        return c.post("/users/", json={"username": f"new{n}", "email": f"new{n}@bench.local", "password": BENCH_PASSWORD})
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentil por rango más cercano."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def run(client: httpx.AsyncClient, scenarios: Scenarios, concurrency: int, duration: float, warmup: float):
+    table = scenarios.table()
+    names, weights = [t[0] for t in table], [t[1] for t in table]
+    calls = {name: call for name, _, call in table}
+    latencies, errors = defaultdict(list), defaultdict(int)
+    logged = set()   # escenarios cuyo primer fallo ya se ha mostrado
+    measuring = False
+    deadline = time.perf_counter() + warmup + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = scenarios.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await calls[name](client)
+                failed = response.status_code >= 400
+            except Exception as e:
+                # Con ASGITransport las excepciones de la app llegan hasta aquí:
+                # se cuentan como error en lugar de parar la carga
+                if name not in logged:
+                    logged.add(name)
+                    logging.getLogger("musicapi.bench").warning("%s falló: %r", name, e)
+                failed = True
+            elapsed = time.perf_counter() - start
+            if measuring:
+                latencies[name].append(elapsed)
+                if failed:
+                    errors[name] += 1
+
+    async def start_measuring():
+        nonlocal measuring
+        await asyncio.sleep(warmup)
+        measuring = True
+
+    begin = time.perf_counter()
+    await asyncio.gather(start_measuring(), *(worker() for _ in range(concurrency)))
+    measured = time.perf_counter() - begin - warmup
+    return latencies, errors, measured
+
+
+def summarize(latencies, errors, elapsed: float, meta: dict) -> dict:
+    scenarios = {}
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        scenarios[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    total = sum(s["count"] for s in scenarios.values())
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024  # en macOS ru_maxrss va en bytes
+    return {
+        "meta": meta,
+        "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "requests": total,
+        "errors": sum(s["errors"] for s in scenarios.values()),
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+        "scenarios": scenarios,
+    }
+
+
+def print_report(result: dict, baseline=None) -> None:
+    base = (baseline or {}).get("scenarios", {})
+    print(f"\n{'escenario':<22}{'n':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Δp95':>9}")
+    for name, s in result["scenarios"].items():
+        delta = ""
+        if name in base and base[name]["p95_ms"]:
+            delta = f"{(s['p95_ms'] / base[name]['p95_ms'] - 1) * 100:+.0f}%"
+        print(f"{name:<22}{s['count']:>7}{s['errors']:>5}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{delta:>9}")
+    line = f"\nthroughput: {result['throughput_rps']} req/s   peticiones: {result['requests']}   errores: {result['errors']}   RSS pico: {result['peak_rss_mb']} MB"
+    if baseline:
+        line += f"   (baseline: {baseline['throughput_rps']} req/s, {baseline['peak_rss_mb']} MB)"
+    print(line)
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        found.append(f"throughput {result['throughput_rps']} < {baseline['throughput_rps']}")
+    for name, s in result["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        # Con pocas muestras el p95 es ruido
+        if old and s["count"] >= 50 and s["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {s['p95_ms']} ms > {old['p95_ms']} ms")
+    return found
+
+
+async def main_async(args) -> int:
+    rng = random.Random(args.seed)
+    volumes = _volumes()
+    if not volumes["songs"]:
+        sys.exit("La BD está vacía: ejecuta antes python -m bench.seed")
+    meta = {
+        "volumes": volumes, "concurrency": args.concurrency, "duration_s": args.duration,
+        "target": args.url or "in-process", "database": os.environ["DATABASE_URL"],
+        "python": platform.python_version(), "cpus": os.cpu_count(),
+    }
+    print(f"Carga contra {meta['target']}: {args.concurrency} clientes, {args.duration}s (+{args.warmup}s de calentamiento)")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            latencies, errors, elapsed = await run(client, Scenarios(volumes, rng), args.concurrency, args.duration, args.warmup)
+    else:
+        import main as app_module
+        # Sin consultas lentas en consola: van a /metrics igualmente
+        logging.getLogger("musicapi.db").setLevel(logging.ERROR)
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with app_module.lifespan(app_module.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                latencies, errors, elapsed = await run(client, Scenarios(volumes, rng), args.concurrency, args.duration, args.warmup)
+
+    result = summarize(latencies, errors, elapsed, meta)
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Baseline guardado en {args.save_baseline}")
+    if baseline:
+        found = regressions(result, baseline, args.tolerance)
+        for r in found:
+            print(f"REGRESIÓN: {r}")
+        return 1 if found else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--url", help="servidor ya arrancado (por defecto, la app en este proceso)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos descartados al principio")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="guardar el resultado en JSON")
+    parser.add_argument("--save-baseline", help="guardar el resultado como baseline")
+    parser.add_argument("--baseline", help="comparar con este baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="empeoramiento admitido (0.5 = 50%%)")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# bench/seed.py
+# Genera una base de datos SQLite de benchmark con volúmenes realistas.
+#
+#   python -m bench.seed --preset small          (~1/100 del volumen real, segundos)
+#   python -m bench.seed --preset full           (1M canciones, 10M likes...)
+#   python -m bench.seed --preset small --songs 50000
+#
+# Los datos son deterministas (--seed) para que dos ejecuciones sean comparables.
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from database import Base, engine, SessionLocal, IS_SQLITE  # noqa: E402
+from models import UserDB, Artist, Album, Song, Playlist, Like, playlist_songs  # noqa: E402
+from likes import rebuild_counts  # noqa: E402
+from utils import get_password_hash  # noqa: E402
+
+PRESETS = {
+    "full": dict(artists=20_000, albums=100_000, songs=1_000_000, users=100_000,
+                 likes=10_000_000, playlists=20_000, max_playlist=10_000),
+    "small": dict(artists=200, albums=1_000, songs=10_000, users=1_000,
+                  likes=100_000, playlists=200, max_playlist=1_000),
+}
+BENCH_PASSWORD = "bench-password"   # la contraseña de todos los usuarios (ver load.py)
+CHUNK = 50_000
+CATEGORIES = ["rock", "pop", "jazz", "hip-hop", "electrónica", "clásica", "folk", "reggaetón"]
+WORDS = ("love night fire dream blue city heart road summer rain gold wild ghost river "
+         "light dance shadow moon storm echo paper glass silver midnight ocean stone").split()
+
+
+def _name(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+def _skewed(rng: random.Random, n: int) -> int:
+    """Id en 1..n con popularidad sesgada (pocos elementos concentran muchos likes)."""
+    return 1 + int(n * rng.random() ** 3)
+
+
+def _insert(conn, table, rows_iter, label: str) -> int:
+    total, batch = 0, []
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            conn.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+            print(f"\r  {label}: {total:,}", end="", flush=True)
+    if batch:
+        conn.execute(insert(table), batch)
+        total += len(batch)
+    print(f"\r  {label}: {total:,}")
+    return total
+
+
+def seed(volumes: dict, rng: random.Random) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    password_hash = get_password_hash(BENCH_PASSWORD)
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA synchronous = OFF"))
+
+        n_art, n_alb, n_song, n_user = volumes["artists"], volumes["albums"], volumes["songs"], volumes["users"]
+        _insert(conn, Artist.__table__, (
+            {"id": i, "name": _name(rng, 2), "bio": _name(rng, 12), "country": "ES"}
+            for i in range(1, n_art + 1)
+        ), "artistas")
+        _insert(conn, Album.__table__, (
+            {"id": i, "title": _name(rng, 3), "description": _name(rng, 10),
+             "category": rng.choice(CATEGORIES), "artist_id": rng.randint(1, n_art)}
+            for i in range(1, n_alb + 1)
+        ), "álbumes")
+
+        def songs():
+            for i in range(1, n_song + 1):
+                album_id = rng.randint(1, n_alb)
+                yield {"id": i, "title": _name(rng, 3), "duration": f"{rng.randint(1, 7)}:{rng.randint(0, 59):02d}",
+                       "album_id": album_id, "artist_id": 1 + album_id % n_art,
+                       "audio_path": f"file:///bench/{i}.mp3"}
+        _insert(conn, Song.__table__, songs(), "canciones")
+
+        _insert(conn, UserDB.__table__, (
+            {"id": i, "username": f"user{i}", "email": f"user{i}@bench.local", "hashed_password": password_hash}
+            for i in range(1, n_user + 1)
+        ), "usuarios")
+
+        def likes():
+            per_user = max(1, volumes["likes"] // n_user)
+            sizes = {"song": n_song, "album": n_alb, "artist": n_art}
+            for user_id in range(1, n_user + 1):
+                seen = set()
+                for _ in range(per_user):
+                    item_type = rng.choices(("song", "album", "artist"), (60, 25, 15))[0]
+                    key = (item_type, _skewed(rng, sizes[item_type]))
+                    if key not in seen:
+                        seen.add(key)
+                        yield {"user_id": user_id, "item_type": key[0], "item_id": key[1]}
+        _insert(conn, Like.__table__, likes(), "likes")
+
+        n_pl, max_pl = volumes["playlists"], volumes["max_playlist"]
+        _insert(conn, Playlist.__table__, (
+            {"id": i, "name": _name(rng, 2), "user_id": rng.randint(1, n_user)}
+            for i in range(1, n_pl + 1)
+        ), "playlists")
+
+        def playlist_rows():
+            for playlist_id in range(1, n_pl + 1):
+                # Casi todas pequeñas, unas pocas enormes; la 1 siempre tiene el máximo
+                size = max_pl if playlist_id == 1 else min(max_pl, int(rng.paretovariate(1.2) * 20))
+                for position, song_id in enumerate(rng.sample(range(1, n_song + 1), min(size, n_song))):
+                    yield {"playlist_id": playlist_id, "song_id": song_id, "position": position}
+        _insert(conn, playlist_songs, playlist_rows(), "canciones en playlists")
+
+    with SessionLocal() as session:
+        print(f"  like_counts: {rebuild_counts(session):,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Siembra la BD de benchmark")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    for key in PRESETS["full"]:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key)
+    parser.add_argument("--force", action="store_true", help="permitir una BD que no sea SQLite")
+    args = parser.parse_args()
+    if not IS_SQLITE and not args.force:
+        sys.exit("seed.py borra y recrea todas las tablas: usa SQLite o pasa --force")
+    # Los INSERT masivos superan el umbral de consulta lenta; no interesa verlos aquí
+    logging.getLogger("musicapi.db").setLevel(logging.ERROR)
+
+    volumes = dict(PRESETS[args.preset])
+    volumes.update({k: v for k, v in vars(args).items() if k in volumes and v is not None})
+    print(f"Sembrando {os.environ['DATABASE_URL']} con {volumes}")
+    start = time.perf_counter()
+    seed(volumes, random.Random(args.seed))
+    print(f"Listo en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# cache.py
+# Caché de respuestas del catálogo (LRU+TTL en proceso o Redis) con ETag.
+#
+# Las claves de listado llevan un número de generación por entidad: al crear o
+# modificar una fila se incrementa la generación y todas las páginas anteriores
+# dejan de usarse sin tener que buscarlas ni borrarlas una a una.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Sequence
+
+from fastapi import Request, Response
+
+from responses import dumps
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")   # "memory", "redis" o "none"
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryBackend:
+    """LRU con caducidad por entrada; vive en el proceso (una copia por worker)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # clave -> (expira_en, valor)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisBackend:
+    """Backend compartido entre workers (cualquier servidor compatible con Redis)."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # dependencia opcional
+        self._redis = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(f"cache:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._redis.set(f"cache:{key}", value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(f"cache:{key}")
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self._redis.get(f"cache-gen:{namespace}") or 0)
+
+    async def bump(self, namespace: str) -> None:
+        await self._redis.incr(f"cache-gen:{namespace}")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Compara con If-None-Match (admite listas y etiquetas débiles W/)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def item_key(namespace: str, item_id) -> str:
+        return f"{namespace}:item:{item_id}"
+
+    async def list_key(self, namespace: str, *parts) -> str:
+        generation = await self.backend.generation(namespace) if self.backend is not None else 0
+        return f"{namespace}:list:{generation}:" + ":".join(str(p) for p in parts)
+
+    async def view_key(self, name: str, depends_on: Sequence[str], *parts) -> str:
+        """Clave de una vista que junta varias entidades: cambia al invalidar cualquiera de ellas."""
+        generations = [await self.backend.generation(ns) if self.backend is not None else 0 for ns in depends_on]
+        return f"{name}:view:{'.'.join(map(str, generations))}:" + ":".join(str(p) for p in parts)
+
+    async def invalidate(self, namespace: str, item_id=None) -> None:
+        """Invalida los listados de la entidad y, si se indica, una fila concreta."""
+        if self.backend is None:
+            return
+        await self.backend.bump(namespace)
+        if item_id is not None:
+            await self.backend.delete(self.item_key(namespace, item_id))
+
+    async def respond(self, request: Request, key: str, producer: Callable[[], Awaitable]) -> Response:
+        """
+        Devuelve la respuesta cacheada para `key` o la genera con `producer`.
+        Se guarda ya serializada junto a su ETag, así que un acierto no vuelve a
+        serializar, y un If-None-Match coincidente devuelve 304 sin cuerpo.
+        """
+        entry = await self.backend.get(key) if self.backend is not None else None
+        if entry is not None:
+            self.hits += 1
+            etag, body = entry.split(b"\n", 1)
+            etag = etag.decode()
+            status = "HIT"
+        else:
+            self.misses += 1
+            body = dumps(await producer())
+            etag = make_etag(body)
+            if self.backend is not None:
+                await self.backend.set(key, etag.encode() + b"\n" + body, self.ttl)
+            status = "MISS"
+
+        headers = {"ETag": etag, "X-Cache": status}
+        if etag_matches(request, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def _make_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL)
+    if CACHE_BACKEND == "none":
+        return None
+    return MemoryBackend(CACHE_MAX_ENTRIES)
+
+
+cache = ResponseCache(_make_backend(), CACHE_TTL)
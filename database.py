@@ -1,32 +1,153 @@
-# (MySQL Nube) 
+# (MySQL Nube)
 # database.py
 import os
-from sqlalchemy import create_engine
+import ssl
+from fastapi import Request
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from db_pool import pool_kwargs, instrument
+from instrumentation import instrument_queries
+from replicas import Replica, ReplicaSet
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
-   
-    # DATABASE_URL = ""
-    pass
 
-CONNECT_ARGS = {
-    "ssl": {
-        "ssl_mode": "required" 
-    }
+    # Configuración local (sin nube): SQLite en un archivo del proyecto.
+    DATABASE_URL = "sqlite:///./musicapi.db"
+
+# Driver asíncrono que usan los routers. Se deduce de DATABASE_URL
+# (mysql -> aiomysql, sqlite -> aiosqlite) o se fija con ASYNC_DATABASE_URL.
+ASYNC_DRIVERS = {
+    "mysql": os.getenv("DB_ASYNC_DRIVER", "aiomysql"),
+    "sqlite": "aiosqlite",
 }
-# Crear conexión
+
+
+def _async_url(url: str) -> str:
+    u = make_url(url)
+    return u.set(drivername=f"{u.get_backend_name()}+{ASYNC_DRIVERS[u.get_backend_name()]}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+# Réplicas de sólo lectura, separadas por comas (mismo formato que DATABASE_URL)
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    CONNECT_ARGS = {}
+    ASYNC_CONNECT_ARGS = {}
+else:
+    CONNECT_ARGS = {
+        "ssl": {
+            "ssl_mode": "required"
+        }
+    }
+    # Los drivers async de MySQL esperan un SSLContext en lugar del dict de PyMySQL
+    ASYNC_CONNECT_ARGS = {
+        "ssl": ssl.create_default_context()
+    }
+
+# Crear conexión (síncrona: DDL, scripts y tareas por lotes)
+# (tamaño, overflow, recycle, timeout y estrategia de ping: ver db_pool.py)
 engine = create_engine(
-    DATABASE_URL, 
-    pool_pre_ping=True,
-    connect_args=CONNECT_ARGS 
+    DATABASE_URL,
+    connect_args=CONNECT_ARGS,
+    **pool_kwargs()
 )
+instrument(engine, "sync")
+instrument_queries(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# Conexión asíncrona (la que usan los endpoints)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=ASYNC_CONNECT_ARGS,
+    **pool_kwargs(async_mode=True)
+)
+instrument(async_engine.sync_engine, "async")
+instrument_queries(async_engine.sync_engine)
+# expire_on_commit=False: tras el commit no hay lazy-load implícito, que en async no está permitido
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _replica(i: int, url: str) -> Replica:
+    name = f"replica-{i}"
+    replica_engine = create_async_engine(
+        _async_url(url),
+        connect_args=ASYNC_CONNECT_ARGS,
+        **pool_kwargs(async_mode=True)
+    )
+    instrument(replica_engine.sync_engine, name)
+    instrument_queries(replica_engine.sync_engine)
+    return Replica(name, replica_engine, async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False))
+
+
+replicas = ReplicaSet([_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS, 1)])
+
+# Parámetros de ruta que identifican lo que se acaba de escribir (ver replicas.mark_written)
+STICKY_PARAMS = {"user_id": "user", "playlist_id": "playlist", "song_id": "song", "album_id": "album", "artist_id": "artist"}
+# Listados sin id en la ruta: tras un alta (replicas.mark_created) se leen del
+# primario, o la página vieja de la réplica llenaría la nueva generación de la caché
+LIST_ROUTES = {"/songs/songs": "song", "/albums/": "album", "/artists/": "artist", "/users/": "user"}
+
 Base = declarative_base()
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _reads_own_writes(request: Request) -> bool:
+    for param, kind in STICKY_PARAMS.items():
+        value = request.path_params.get(param)
+        if value is None:
+            continue
+        try:
+            item_id = int(value)
+        except ValueError:
+            continue  # la validación del endpoint responderá 422
+        if replicas.is_sticky(kind, item_id):
+            return True
+    route = request.scope.get("route")
+    kind = LIST_ROUTES.get(getattr(route, "path", None))
+    return kind is not None and replicas.is_sticky(kind, None)
+
+
+async def get_read_db(request: Request):
+    """
+    Sesión para las rutas GET: una réplica si las hay, el primario si no.
+    Se pide la conexión antes de entrar en el endpoint para que, si la réplica
+    no responde, se pase a otra (o al primario) sin fallar la petición.
+    """
+    tried = []
+    replica = None
+    if replicas.replicas and not _reads_own_writes(request):
+        replica = replicas.choose()
+    while replica is not None:
+        db = replica.sessionmaker()
+        try:
+            await db.connection()
+        except (exc.DBAPIError, OSError) as e:
+            await db.close()
+            replicas.mark_down(replica, e)
+            tried.append(replica)
+            replica = replicas.choose(exclude=tried)
+            continue
+        replica.in_use += 1
+        replica.sessions += 1
+        try:
+            yield db
+        finally:
+            replica.in_use -= 1
+            await db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+
+def ReadSessionLocal():
+    """Sesión de sólo lectura fuera de una petición (p. ej. /export): réplica o primario."""
+    replica = replicas.choose()
+    return replica.sessionmaker() if replica else AsyncSessionLocal()
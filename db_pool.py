@@ -0,0 +1,138 @@
+# db_pool.py
+# Pool de conexiones instrumentado y ping pesimista "sólo tras inactividad".
+import os
+import time
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from metrics import Histogram
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))   # segundos; -1 desactiva
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# "always": pool_pre_ping en cada checkout (comportamiento anterior)
+# "idle":   ping sólo si la conexión lleva más de DB_PING_IDLE_SECONDS sin usarse
+# "never":  sin ping
+POOL_PING = os.getenv("DB_POOL_PING", "always")
+PING_IDLE_SECONDS = float(os.getenv("DB_PING_IDLE_SECONDS", "30"))
+
+if POOL_PING not in ("always", "idle", "never"):
+    raise ValueError(f"DB_POOL_PING inválido: {POOL_PING}")
+
+
+class PoolMetrics:
+    """Contadores de un pool: espera en checkout, timeouts y pings."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wait = Histogram()
+        self.timeouts = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self._lock = threading.Lock()
+
+    def incr(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+
+class _TimedPoolMixin:
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.incr("timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.wait.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() recrea el pool: conservamos las métricas acumuladas
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Registro de pools expuesto en /admin/pool
+POOLS = {}
+
+
+def pool_kwargs(async_mode: bool = False) -> dict:
+    """Argumentos de create_engine / create_async_engine según el entorno."""
+    return {
+        "poolclass": TimedAsyncQueuePool if async_mode else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_pre_ping": POOL_PING == "always",
+    }
+
+
+def instrument(engine, name: str) -> None:
+    """Registra el pool del engine (sync) y, si procede, el ping por inactividad."""
+    engine.pool.metrics = metrics = PoolMetrics(name)
+    POOLS[name] = engine
+    if POOL_PING != "idle":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connection_record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_used = connection_record.info.get("last_used")
+        if last_used is None or time.monotonic() - last_used < PING_IDLE_SECONDS:
+            return
+        metrics.incr("pings")
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            metrics.incr("ping_failures")
+            # El pool descarta esta conexión y reintenta con una nueva
+            raise exc.DisconnectionError()
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+def pool_stats() -> dict:
+    stats = {}
+    for name, engine in POOLS.items():
+        pool = engine.pool
+        metrics = pool.metrics
+        stats[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeouts": metrics.timeouts,
+            "pings": metrics.pings,
+            "ping_failures": metrics.ping_failures,
+            "wait_seconds": metrics.wait.snapshot(),
+        }
+    return stats
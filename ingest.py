@@ -0,0 +1,437 @@
+# ingest.py
+# Carga masiva del catálogo (artistas, álbumes y canciones) desde NDJSON o CSV.
+#
+# Una fila por registro, con `type` = artist | album | song:
+#   {"type": "artist", "name": "Nadia", "country": "ES", "artist_pic": "nadia.jpg"}
+#   {"type": "album", "title": "Mar", "artist": "Nadia", "category": "Pop", "cover": "mar.jpg"}
+#   {"type": "song", "title": "Ola", "artist": "Nadia", "album": "Mar", "duration": "3:12", "audio": "ola.mp3"}
+# En CSV, las mismas columnas con cabecera (las celdas vacías son nulos).
+#
+# Las referencias se resuelven por clave natural (nombre del artista, título del
+# álbum dentro del artista) o por id (artist_id, album_id). Lo que ya existe con
+# la misma clave no se duplica, así que repetir una carga es inocuo. Los medios
+# son una URL (se guarda tal cual) o un nombre de archivo, que se sube con el
+# backend de uploads.py desde un pool de hilos.
+#
+# Se escribe en transacciones de `batch_size` filas con INSERT multi-fila. Una
+# fila inválida se anota en el informe y la carga sigue; si falla el INSERT de
+# un lote, ese lote se repite fila a fila para saber cuál es la culpable.
+#
+#   python ingest.py catalogo.ndjson --media-dir ./label
+#   python ingest.py catalogo.csv --batch-size 5000 --report informe.json
+import csv
+import io
+import json
+import os
+import sys
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import media_assets
+from likes import insert_ignore
+from models import Artist, Album, Song, MediaAsset
+from schemas import ArtistIngest, AlbumIngest, SongIngest
+from uploads import MEDIA_DEDUP, upload_fileobj
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional (ver responses.py)
+    orjson = None
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_UPLOAD_WORKERS = int(os.getenv("INGEST_UPLOAD_WORKERS", "8"))
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "1000"))   # errores detallados en el informe
+IN_CHUNK_SIZE = 1000
+
+INGEST_TYPES = {"artist": ArtistIngest, "album": AlbumIngest, "song": SongIngest}
+# tipo -> (campo de la fila, columna, carpeta del backend de subida)
+MEDIA_FIELDS = {
+    "artist": ("artist_pic", "artist_pic", "music_app_artist_pics"),
+    "album": ("cover", "cover_url", "music_app_album_covers"),
+    "song": ("audio", "audio_path", "music_app_songs"),
+}
+
+
+def read_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """(nº de línea, dict) por fila, o (nº de línea, excepción) si no se puede leer."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k: v.strip() for k, v in row.items() if k and v and v.strip()}
+        return
+    for n, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield n, orjson.loads(line) if orjson is not None else json.loads(line)
+        except ValueError as e:  # orjson.JSONDecodeError y json.JSONDecodeError heredan de ValueError
+            yield n, ValueError(f"JSON inválido: {e}")
+
+
+def _norm(text: str) -> str:
+    """
+    Clave de comparación de nombres y títulos. MySQL compara con colaciones *_ai_ci
+    (sin mayúsculas ni acentos) y devuelve la grafía guardada, no la pedida: las
+    cachés se indexan por esta forma para que "nadia" encuentre a "Nadia".
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).rstrip()
+
+
+def guess_format(filename: Optional[str]) -> str:
+    return "csv" if (filename or "").lower().endswith(".csv") else "ndjson"
+
+
+def _describe(error: Exception) -> str:
+    if hasattr(error, "errors"):  # ValidationError de pydantic
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'fila'}: {e['msg']}" for e in error.errors())
+    if isinstance(error, SQLAlchemyError):
+        return str(getattr(error, "orig", None) or error).splitlines()[0]
+    return str(error)
+
+
+class _Row:
+    __slots__ = ("line", "type", "data", "media_url", "artist_id", "album_id")
+
+    def __init__(self, line: int, kind: str, data):
+        self.line = line
+        self.type = kind
+        self.data = data
+        self.media_url = None     # se conserva si el lote se repite fila a fila
+        self.artist_id = None
+        self.album_id = None
+
+
+def _validate(line: int, raw) -> _Row:
+    if not isinstance(raw, dict):
+        raise ValueError("se esperaba un objeto")
+    kind = raw.get("type")
+    if kind not in INGEST_TYPES:
+        raise ValueError(f"type inválido: {kind!r} (artist, album o song)")
+    data = INGEST_TYPES[kind].model_validate({k: v for k, v in raw.items() if k != "type"})
+    if kind != "artist" and data.artist_id is None and not data.artist:
+        raise ValueError("falta artist o artist_id")
+    return _Row(line, kind, data)
+
+
+class _Batch:
+    """Resultado de un lote; sólo pasa al informe si el lote llega a hacer commit."""
+
+    def __init__(self):
+        self.created = Counter()
+        self.existing = Counter()
+        self.errors = []
+        self.items = []
+
+    def error(self, row: _Row, message: str) -> None:
+        self.errors.append((row.line, row.type, message))
+
+
+class Ingester:
+    def __init__(self, db: Session, open_media: Callable[[str], BinaryIO],
+                 batch_size: int = INGEST_BATCH_SIZE, workers: int = INGEST_UPLOAD_WORKERS,
+                 collect_items: bool = False):
+        self.db = db
+        self.open_media = open_media
+        self.batch_size = batch_size
+        self.workers = workers
+        self.collect_items = collect_items
+        self.artists = {}    # _norm(nombre) -> id
+        self.albums = {}     # (artist_id, _norm(título)) -> id
+        self.items = []      # (tipo, id, fila) creados, para los índices en memoria
+        self.report = {
+            "rows": 0,
+            "created": dict.fromkeys(INGEST_TYPES, 0),
+            "existing": dict.fromkeys(INGEST_TYPES, 0),
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def _error(self, line: int, kind: Optional[str], message: str) -> None:
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < INGEST_MAX_ERRORS:
+            self.report["errors"].append({"line": line, "type": kind, "error": message})
+
+    def run(self, rows: Iterable[Tuple[int, object]]) -> dict:
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-upload") as pool:
+            self.pool = pool
+            chunk = []
+            for line, raw in rows:
+                self.report["rows"] += 1
+                if isinstance(raw, Exception):
+                    self._error(line, None, str(raw))
+                    continue
+                try:
+                    chunk.append(_validate(line, raw))
+                except ValueError as e:
+                    self._error(line, raw.get("type") if isinstance(raw, dict) else None, _describe(e))
+                if len(chunk) >= self.batch_size:
+                    self._flush(chunk)
+                    chunk = []
+            if chunk:
+                self._flush(chunk)
+        return self.report
+
+    def _flush(self, chunk: List[_Row]) -> None:
+        try:
+            self._commit(chunk)
+        except SQLAlchemyError:
+            self._rollback()
+            for row in chunk:
+                try:
+                    self._commit([row])
+                except SQLAlchemyError as e:
+                    self._rollback()
+                    self._error(row.line, row.type, _describe(e))
+
+    def _commit(self, rows: List[_Row]) -> None:
+        batch = _Batch()
+        self._ingest_artists([r for r in rows if r.type == "artist"], batch)
+        self._ingest_albums([r for r in rows if r.type == "album"], batch)
+        self._ingest_songs([r for r in rows if r.type == "song"], batch)
+        self.db.commit()
+        for kind, n in batch.created.items():
+            self.report["created"][kind] += n
+        for kind, n in batch.existing.items():
+            self.report["existing"][kind] += n
+        for line, kind, message in batch.errors:
+            self._error(line, kind, message)
+        if self.collect_items:
+            self.items.extend(batch.items)
+
+    def _rollback(self) -> None:
+        self.db.rollback()
+        # Los ids resueltos en el lote fallido pueden no existir ya
+        self.artists.clear()
+        self.albums.clear()
+
+    # RESOLUCIÓN DE REFERENCIAS
+
+    def _load_artists(self, names) -> None:
+        names = [n for n in set(names) if _norm(n) not in self.artists]
+        for i in range(0, len(names), IN_CHUNK_SIZE):
+            stmt = (
+                select(Artist.name, func.min(Artist.id))
+                .where(Artist.name.in_(names[i:i + IN_CHUNK_SIZE]))
+                .group_by(Artist.name)
+            )
+            self.artists.update((_norm(name), i) for name, i in self.db.execute(stmt))
+
+    def _load_albums(self, keys) -> None:
+        keys = [(a, t) for a, t in set(keys) if (a, _norm(t)) not in self.albums]
+        for i in range(0, len(keys), IN_CHUNK_SIZE):
+            stmt = (
+                select(Album.artist_id, Album.title, func.min(Album.id))
+                .where(tuple_(Album.artist_id, Album.title).in_(keys[i:i + IN_CHUNK_SIZE]))
+                .group_by(Album.artist_id, Album.title)
+            )
+            self.albums.update(((a, _norm(t)), i) for a, t, i in self.db.execute(stmt))
+
+    def _existing_ids(self, model, ids) -> set:
+        ids = list(set(ids))
+        found = set()
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            found.update(self.db.scalars(select(model.id).where(model.id.in_(ids[i:i + IN_CHUNK_SIZE]))))
+        return found
+
+    def _resolve_artists(self, rows: List[_Row], batch: _Batch) -> List[_Row]:
+        self._load_artists(r.data.artist for r in rows if r.data.artist_id is None)
+        valid_ids = self._existing_ids(Artist, (r.data.artist_id for r in rows if r.data.artist_id is not None))
+        resolved = []
+        for r in rows:
+            r.artist_id = r.data.artist_id if r.data.artist_id in valid_ids else self.artists.get(_norm(r.data.artist))
+            if r.artist_id is None:
+                batch.error(r, f"artista no encontrado: {r.data.artist_id or r.data.artist}")
+            else:
+                resolved.append(r)
+        return resolved
+
+    # SUBIDAS
+
+    def _upload_one(self, name: str, folder: str):
+        """(url, sha256, tamaño). El registro en media_assets lo hace el hilo principal."""
+        with self.open_media(name) as f:
+            digest, size = media_assets.content_hash(f) if MEDIA_DEDUP else (None, 0)
+            return upload_fileobj(f, folder, os.path.basename(name), digest, size, register=False), digest, size
+
+    def _upload(self, rows: List[_Row], batch: _Batch) -> List[_Row]:
+        """Sube en paralelo los medios de las filas que se van a insertar."""
+        if not rows:
+            return rows
+        field, _, folder = MEDIA_FIELDS[rows[0].type]
+        futures = []
+        for r in rows:
+            value = getattr(r.data, field)
+            if not value or r.media_url is not None:
+                continue
+            if value.startswith(("http://", "https://")):
+                r.media_url = value
+            else:
+                futures.append((r, value, self.pool.submit(self._upload_one, value, folder)))
+        failed = set()
+        assets = {}
+        for r, value, future in futures:
+            try:
+                r.media_url, digest, size = future.result()
+            except OSError as e:
+                batch.error(r, f"no se pudo leer {value}: {e}")
+                failed.add(r.line)
+                continue
+            except Exception as e:
+                batch.error(r, f"no se pudo subir {value}: {e}")
+                failed.add(r.line)
+                continue
+            if not r.media_url:
+                batch.error(r, f"no se pudo subir {value}")
+                failed.add(r.line)
+            elif digest is not None:
+                assets.setdefault(digest, {"content_hash": digest, "url": r.media_url, "size": size})
+        if assets:
+            # En la transacción del lote: con SQLite otra conexión no podría escribir ahora
+            self.db.execute(insert_ignore(self.db, MediaAsset).values(list(assets.values())))
+        return [r for r in rows if r.line not in failed]
+
+    # INSERCIÓN POR TIPO
+
+    def _ingest_artists(self, rows: List[_Row], batch: _Batch) -> None:
+        self._load_artists(r.data.name for r in rows)
+        new, seen = [], set()
+        for r in rows:
+            key = _norm(r.data.name)
+            if key in self.artists or key in seen:
+                batch.existing["artist"] += 1
+            else:
+                seen.add(key)
+                new.append(r)
+        new = self._upload(new, batch)
+        if not new:
+            return
+        values = [
+            {"name": r.data.name, "bio": r.data.bio, "country": r.data.country, "artist_pic": r.media_url}
+            for r in new
+        ]
+        self.db.execute(insert(Artist), values)
+        self._load_artists(v["name"] for v in values)
+        batch.created["artist"] += len(values)
+        batch.items.extend(("artist", self.artists[_norm(v["name"])], v) for v in values)
+
+    def _ingest_albums(self, rows: List[_Row], batch: _Batch) -> None:
+        rows = self._resolve_artists(rows, batch)
+        self._load_albums((r.artist_id, r.data.title) for r in rows)
+        new, seen = [], set()
+        for r in rows:
+            key = (r.artist_id, _norm(r.data.title))
+            if key in self.albums or key in seen:
+                batch.existing["album"] += 1
+            else:
+                seen.add(key)
+                new.append(r)
+        new = self._upload(new, batch)
+        if not new:
+            return
+        values = [
+            {"title": r.data.title, "description": r.data.description, "category": r.data.category,
+             "artist_id": r.artist_id, "cover_url": r.media_url}
+            for r in new
+        ]
+        self.db.execute(insert(Album), values)
+        self._load_albums((v["artist_id"], v["title"]) for v in values)
+        batch.created["album"] += len(values)
+        batch.items.extend(("album", self.albums[(v["artist_id"], _norm(v["title"]))], v) for v in values)
+
+    def _ingest_songs(self, rows: List[_Row], batch: _Batch) -> None:
+        rows = self._resolve_artists(rows, batch)
+        self._load_albums((r.artist_id, r.data.album) for r in rows if r.data.album_id is None and r.data.album)
+        valid_album_ids = self._existing_ids(Album, (r.data.album_id for r in rows if r.data.album_id is not None))
+        resolved = []
+        for r in rows:
+            if r.data.album_id is not None:
+                r.album_id = r.data.album_id if r.data.album_id in valid_album_ids else None
+            elif r.data.album:
+                r.album_id = self.albums.get((r.artist_id, _norm(r.data.album)))
+            if r.album_id is None and (r.data.album_id is not None or r.data.album):
+                batch.error(r, f"álbum no encontrado: {r.data.album_id or r.data.album}")
+            else:
+                resolved.append(r)
+
+        existing = self._song_ids((r.artist_id, r.album_id or 0, r.data.title) for r in resolved)
+        new, seen = [], set()
+        for r in resolved:
+            key = (r.artist_id, r.album_id or 0, _norm(r.data.title))
+            if key in existing or key in seen:
+                batch.existing["song"] += 1
+            else:
+                seen.add(key)
+                new.append(r)
+        new = self._upload(new, batch)
+        if not new:
+            return
+        values = [
+            {"title": r.data.title, "duration": r.data.duration, "artist_id": r.artist_id,
+             "album_id": r.album_id, "audio_path": r.media_url, "upload_status": "ready"}
+            for r in new
+        ]
+        self.db.execute(insert(Song), values)
+        batch.created["song"] += len(values)
+        if self.collect_items:
+            ids = self._song_ids((v["artist_id"], v["album_id"] or 0, v["title"]) for v in values)
+            batch.items.extend(("song", ids[(v["artist_id"], v["album_id"] or 0, _norm(v["title"]))], v) for v in values)
+
+    def _song_ids(self, keys) -> dict:
+        """Clave natural de una canción: (artista, álbum o 0, _norm(título)) -> id."""
+        keys = list(set(keys))
+        album = func.coalesce(Song.album_id, 0)
+        found = {}
+        for i in range(0, len(keys), IN_CHUNK_SIZE):
+            stmt = (
+                select(Song.artist_id, album, Song.title, func.min(Song.id))
+                .where(tuple_(Song.artist_id, album, Song.title).in_(keys[i:i + IN_CHUNK_SIZE]))
+                .group_by(Song.artist_id, album, Song.title)
+            )
+            found.update(((a, b, _norm(t)), i) for a, b, t, i in self.db.execute(stmt))
+        return found
+
+
+def local_media(directory: str) -> Callable[[str], BinaryIO]:
+    """Los nombres de archivo de las filas son rutas relativas a `directory`."""
+    def open_media(name: str) -> BinaryIO:
+        return open(os.path.join(directory, name), "rb")
+    return open_media
+
+
+def main() -> None:
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Carga masiva del catálogo desde NDJSON o CSV")
+    parser.add_argument("path", help="archivo .ndjson o .csv")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="por defecto, según la extensión")
+    parser.add_argument("--media-dir", help="directorio de los archivos referenciados (por defecto, el del catálogo)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="filas por transacción")
+    parser.add_argument("--workers", type=int, default=INGEST_UPLOAD_WORKERS, help="subidas en paralelo")
+    parser.add_argument("--report", help="guardar el informe completo en JSON")
+    args = parser.parse_args()
+
+    media_dir = args.media_dir or os.path.dirname(os.path.abspath(args.path))
+    with open(args.path, "rb") as f, SessionLocal() as db:
+        ingester = Ingester(db, local_media(media_dir), args.batch_size, args.workers)
+        report = ingester.run(read_rows(f, args.format or guess_format(args.path)))
+
+    print(f"filas: {report['rows']}   creadas: {report['created']}   ya existían: {report['existing']}   errores: {report['error_count']}")
+    for e in report["errors"][:20]:
+        print(f"  línea {e['line']} ({e['type'] or '?'}): {e['error']}")
+    if args.report:
+        with open(args.report, "w") as out:
+            json.dump(report, out, indent=2, ensure_ascii=False)
+    sys.exit(1 if report["error_count"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# instrumentation.py
+# Métricas por petición: latencia por ruta, nº de consultas y tiempo de BD
+# (eventos before/after_cursor_execute), detección de N+1 y log de consultas
+# lentas. Todo se expone en formato Prometheus en /metrics (routers/metrics.py).
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from metrics import Histogram
+
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+# Mismo statement más de N veces en una petición -> probable N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+logger = logging.getLogger("musicapi.db")
+
+
+class RequestStats:
+    """Consultas de la petición en curso (vive en un ContextVar)."""
+
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses = Counter()
+        self.n_plus_one = 0
+
+
+class Registry:
+    def __init__(self):
+        self.routes = defaultdict(RouteMetrics)
+        self.query_time = Histogram()
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        with self._lock:
+            return self.routes[(method, path)]
+
+    def incr_slow(self) -> None:
+        with self._lock:
+            self.slow_queries += 1
+
+
+registry = Registry()
+
+
+def _redacted(parameters) -> str:
+    """Sólo los tipos de los parámetros: los valores (emails, hashes...) no van al log."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: <{type(v).__name__}>" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"<{len(parameters)} filas>"  # executemany
+        return "(" + ", ".join(f"<{type(v).__name__}>" for v in parameters) + ")"
+    return "<?>"
+
+
+def instrument_queries(engine) -> None:
+    """Engancha el cronometraje de consultas a un engine (sync, o `.sync_engine` del async)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        registry.query_time.observe(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+        if elapsed >= SLOW_QUERY_SECONDS:
+            registry.incr_slow()
+            logger.warning("consulta lenta (%.3fs): %s params=%s", elapsed, " ".join(statement.split()), _redacted(parameters))
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada petición HTTP y la atribuye a la plantilla de la ruta
+    (`/songs/{song_id}`, no `/songs/42`). Añade Server-Timing con el tiempo de BD.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        finished = None
+        status = 500
+
+        async def wrapped_send(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Las BackgroundTasks se ejecutan después: no cuentan como latencia
+                finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<sin ruta>"
+            metrics = registry.route(scope["method"], path)
+            metrics.latency.observe((finished or time.perf_counter()) - start)
+            metrics.db_time.observe(stats.db_time)
+            metrics.queries.observe(stats.queries)
+            metrics.statuses[f"{status // 100}xx"] += 1
+            repeated = [(s, n) for s, n in stats.statements.items() if n > N_PLUS_ONE_THRESHOLD]
+            if repeated:
+                metrics.n_plus_one += 1
+                for statement, n in repeated:
+                    logger.warning("posible N+1 en %s %s: %d ejecuciones de %s", scope["method"], path, n, " ".join(statement.split()))
+
+
+# FORMATO PROMETHEUS
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, snapshot: dict, **labels) -> list:
+    lines = [f"{name}_bucket{_labels(**labels, le=le)} {n}" for le, n in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+
+def render_prometheus(pool_stats: dict, cache_stats: dict) -> str:
+    out = []
+
+    def family(name, kind, help_text, lines):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+
+    routes = sorted(registry.routes.items())
+    family("http_request_duration_seconds", "histogram", "Latencia de las peticiones por ruta.", [
+        line for (method, path), m in routes
+        for line in _histogram_lines("http_request_duration_seconds", m.latency.snapshot(), method=method, route=path)
+    ])
+    family("http_requests_total", "counter", "Peticiones por ruta y clase de estado.", [
+        f"http_requests_total{_labels(method=method, route=path, status=status)} {n}"
+        for (method, path), m in routes for status, n in sorted(m.statuses.items())
+    ])
+    family("http_request_db_queries", "histogram", "Consultas SQL por petición.", [
+        line for (method, path), m in routes
+        for line in _histogram_lines("http_request_db_queries", m.queries.snapshot(), method=method, route=path)
+    ])
+    family("http_request_db_seconds", "histogram", "Tiempo de BD por petición.", [
+        line for (method, path), m in routes
+        for line in _histogram_lines("http_request_db_seconds", m.db_time.snapshot(), method=method, route=path)
+    ])
+    family("http_requests_n_plus_one_total", "counter", f"Peticiones con un statement repetido más de {N_PLUS_ONE_THRESHOLD} veces.", [
+        f"http_requests_n_plus_one_total{_labels(method=method, route=path)} {m.n_plus_one}"
+        for (method, path), m in routes
+    ])
+    family("db_query_duration_seconds", "histogram", "Duración de cada consulta SQL.",
+           _histogram_lines("db_query_duration_seconds", registry.query_time.snapshot()))
+    family("db_slow_queries_total", "counter", f"Consultas de más de {SLOW_QUERY_SECONDS}s.",
+           [f"db_slow_queries_total {registry.slow_queries}"])
+
+    for key, kind in (("size", "gauge"), ("checked_out", "gauge"), ("overflow", "gauge"),
+                      ("timeouts", "counter"), ("pings", "counter"), ("ping_failures", "counter")):
+        name = f"db_pool_{key}" + ("_total" if kind == "counter" else "")
+        family(name, kind, f"Pool de conexiones: {key}.", [
+            f"{name}{_labels(pool=pool)} {stats[key]}" for pool, stats in pool_stats.items()
+        ])
+    family("db_pool_wait_seconds", "histogram", "Espera para obtener una conexión del pool.", [
+        line for pool, stats in pool_stats.items()
+        for line in _histogram_lines("db_pool_wait_seconds", stats["wait_seconds"], pool=pool)
+    ])
+
+    for key in ("hits", "misses", "not_modified"):
+        family(f"response_cache_{key}_total", "counter", f"Caché de respuestas: {key}.",
+               [f"response_cache_{key}_total {cache_stats[key]}"])
+    return "\n".join(out) + "\n"
@@ -0,0 +1,213 @@
+# likes.py
+# Operaciones de likes basadas en conjuntos (sin leer antes de escribir) y
+# mantenimiento de los contadores desnormalizados de `like_counts`.
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Like, LikeCount, UserDB, Song, Artist, Album
+from schemas import SongOut, ArtistOut, AlbumOut
+
+LIKE_TYPES = ("artist", "album", "song")
+
+
+def insert_ignore(session: AsyncSession, model):
+    """
+    INSERT que no falla si la clave primaria ya existe (según el dialecto). En
+    ambos, rowcount cuenta sólo las filas insertadas de verdad.
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "mysql":
+        # No ON DUPLICATE KEY UPDATE pk=pk: con CLIENT_FOUND_ROWS (lo activa
+        # SQLAlchemy) un duplicado cuenta como fila afectada
+        return mysql.insert(model).prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing()
+    raise NotImplementedError(f"Dialecto no soportado: {dialect}")
+
+
+def _upsert_counts(session: AsyncSession, rows: List[dict]):
+    """INSERT ... ON DUPLICATE KEY UPDATE count = count + delta (según el dialecto)."""
+    dialect = session.bind.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(LikeCount).values(rows)
+        return stmt.on_duplicate_key_update(count=LikeCount.count + stmt.inserted["count"])
+    if dialect == "sqlite":
+        stmt = sqlite.insert(LikeCount).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[LikeCount.item_type, LikeCount.item_id],
+            set_={"count": LikeCount.count + stmt.excluded["count"]},
+        )
+    raise NotImplementedError(f"Dialecto no soportado: {dialect}")
+
+
+async def bump_counts(db: AsyncSession, deltas: Dict[Tuple[str, int], int]) -> None:
+    """Aplica incrementos/decrementos a `like_counts` en un solo statement."""
+    rows = [{"item_type": t, "item_id": i, "count": d} for (t, i), d in deltas.items() if d]
+    if rows:
+        await db.execute(_upsert_counts(db, rows))
+
+
+async def toggle(db: AsyncSession, user_id: int, item_type: str, item_id: int) -> bool:
+    """
+    Alterna un like sin SELECT previo: se intenta borrar y, si no había fila,
+    se inserta. El contador se actualiza en la misma transacción.
+    Devuelve el estado final (True = con like). No hace commit.
+    """
+    result = await db.execute(
+        delete(Like).where(
+            Like.user_id == user_id, Like.item_type == item_type, Like.item_id == item_id
+        )
+    )
+    if result.rowcount:
+        await bump_counts(db, {(item_type, item_id): -1})
+        return False
+    result = await db.execute(insert_ignore(db, Like).values(user_id=user_id, item_type=item_type, item_id=item_id))
+    if result.rowcount:
+        await bump_counts(db, {(item_type, item_id): 1})
+    return True
+
+
+def coalesce(operations: Iterable[Tuple[str, int, bool]]) -> Dict[Tuple[str, int], bool]:
+    """Reduce una ráfaga de operaciones al estado final por elemento (gana la última)."""
+    final = {}
+    for item_type, item_id, liked in operations:
+        final[(item_type, item_id)] = liked
+    return final
+
+
+async def apply_batch(db: AsyncSession, user_id: int, final: Dict[Tuple[str, int], bool]) -> Tuple[List, List, Dict]:
+    """
+    Aplica el estado final con un SELECT de las filas afectadas, como mucho un
+    INSERT multi-fila y un DELETE, y un único upsert de contadores.
+    Devuelve (likes, unlikes, deltas), con deltas = {(tipo, id): +1/-1} sólo de
+    lo que cambió de verdad. No hace commit.
+    """
+    if not final:
+        return [], [], {}
+
+    # Necesitamos saber qué cambia de verdad para que los contadores cuadren
+    existing = set(
+        (await db.execute(
+            select(Like.item_type, Like.item_id).where(
+                Like.user_id == user_id,
+                tuple_(Like.item_type, Like.item_id).in_(list(final)),
+            )
+        )).tuples()
+    )
+    to_like = [key for key, liked in final.items() if liked]
+    to_unlike = [key for key, liked in final.items() if not liked]
+    new_likes = [key for key in to_like if key not in existing]
+    removed = [key for key in to_unlike if key in existing]
+
+    if new_likes:
+        await db.execute(
+            insert_ignore(db, Like).values(
+                [{"user_id": user_id, "item_type": t, "item_id": i} for t, i in new_likes]
+            )
+        )
+    if removed:
+        await db.execute(
+            delete(Like).where(
+                Like.user_id == user_id,
+                tuple_(Like.item_type, Like.item_id).in_(removed),
+            )
+        )
+
+    deltas = {key: 1 for key in new_likes}
+    deltas.update({key: -1 for key in removed})
+    await bump_counts(db, deltas)
+    return to_like, to_unlike, deltas
+
+
+# grupo de la respuesta -> (item_type, modelo, esquema de salida)
+PROFILE_GROUPS = {
+    "songs": ("song", Song, SongOut),
+    "artists": ("artist", Artist, ArtistOut),
+    "albums": ("album", Album, AlbumOut),
+}
+
+
+async def grouped_for_user(db: AsyncSession, user_id: int, limit: int, offsets: Dict[str, int]):
+    """
+    Likes de un usuario agrupados por tipo en UNA consulta: los likes se numeran
+    por grupo (ROW_NUMBER), se recorta la página de cada grupo y se hace LEFT JOIN
+    con las tres tablas leyendo sólo las columnas de los esquemas de salida.
+    Partir de `users` permite distinguir "usuario inexistente" de "sin likes".
+    La fila rn=1 de cada grupo se une siempre para conocer el total aunque la
+    página pedida quede fuera de rango. Devuelve None si el usuario no existe.
+    """
+    numbered = (
+        select(
+            Like.item_type,
+            Like.item_id,
+            func.row_number().over(partition_by=Like.item_type, order_by=Like.item_id).label("rn"),
+            func.count().over(partition_by=Like.item_type).label("total"),
+        )
+        .where(Like.user_id == user_id)
+        .subquery()
+    )
+    page = or_(*(
+        and_(
+            numbered.c.item_type == item_type,
+            numbered.c.rn > offsets.get(group, 0),
+            numbered.c.rn <= offsets.get(group, 0) + limit,
+        )
+        for group, (item_type, _, _) in PROFILE_GROUPS.items()
+    ))
+
+    columns = [numbered.c.item_type, numbered.c.rn, numbered.c.total]
+    for group, (_, model, schema) in PROFILE_GROUPS.items():
+        columns += [getattr(model, name).label(f"{group}__{name}") for name in schema.model_fields]
+    stmt = select(*columns).select_from(UserDB).outerjoin(numbered, or_(page, numbered.c.rn == 1))
+    for group, (item_type, model, _) in PROFILE_GROUPS.items():
+        stmt = stmt.outerjoin(model, and_(numbered.c.item_type == item_type, model.id == numbered.c.item_id))
+    stmt = stmt.where(UserDB.id == user_id).order_by(numbered.c.item_type, numbered.c.rn)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    if not rows:
+        return None
+
+    result = {group: [] for group in PROFILE_GROUPS}
+    totals = {group: 0 for group in PROFILE_GROUPS}
+    for row in rows:
+        for group, (item_type, _, schema) in PROFILE_GROUPS.items():
+            if row["item_type"] != item_type:
+                continue
+            totals[group] = row["total"]
+            offset = offsets.get(group, 0)
+            if not offset < row["rn"] <= offset + limit:
+                continue
+            # Si el elemento ya no existe el LEFT JOIN deja la fila vacía
+            if row[f"{group}__id"] is not None:
+                result[group].append({name: row[f"{group}__{name}"] for name in schema.model_fields})
+    return result, totals
+
+
+def rebuild_counts(db: Session) -> int:
+    """
+    Reconciliación: reconstruye `like_counts` desde `likes` con un único
+    INSERT ... SELECT ... GROUP BY. Corrige cualquier deriva de los contadores.
+    """
+    db.execute(delete(LikeCount))
+    aggregated = (
+        select(Like.item_type, Like.item_id, func.count())
+        .group_by(Like.item_type, Like.item_id)
+    )
+    db.execute(insert(LikeCount).from_select(["item_type", "item_id", "count"], aggregated))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(LikeCount))
+
+
+if __name__ == "__main__":
+    # python likes.py rebuild-counts
+    from database import SessionLocal
+
+    if sys.argv[1:] != ["rebuild-counts"]:
+        sys.exit("uso: python likes.py rebuild-counts")
+    with SessionLocal() as session:
+        print(f"like_counts reconstruido: {rebuild_counts(session)} elementos")
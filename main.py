@@ -1,27 +1,69 @@
 # main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 # NOTA: Importaciones ABSOLUTAS (sin punto '.')
-from database import Base, engine 
-from routers import users, artists, albums, songs, playlists 
+from database import Base, engine, async_engine 
+from routers import users, artists, albums, songs, playlists, export, admin, charts, search, autocomplete, metrics, ingest 
+from search import search_index
+from autocomplete import autocomplete_index
 import utils
+from responses import FastJSONResponse
+from middleware import CompressionMiddleware, ConditionalGetMiddleware
+from instrumentation import InstrumentationMiddleware
 
 
-Base.metadata.create_all(bind=engine)
+# El esquema se gestiona con Alembic (alembic upgrade head, ver migrations/).
+# DB_CREATE_ALL=1 crea las tablas al arrancar, sólo para desarrollo local con SQLite.
+if os.getenv("DB_CREATE_ALL") == "1":
+    Base.metadata.create_all(bind=engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        # Índice de búsqueda en memoria (no hace nada con FULLTEXT de MySQL)
+        await search_index.build()
+        # Sugerencias por prefijo, ordenadas por likes
+        await autocomplete_index.build()
+        yield
+    finally:
+        # También si algo falla: los hilos de aiosqlite que queden vivos impiden
+        # que el proceso termine
+        utils.shutdown_hash_pool()
+        # Cierra las conexiones del pool (con aiosqlite, cada una es un hilo)
+        await async_engine.dispose()
 
 
 app = FastAPI(
     title="Música API - Modularizada", 
-    description="Backend para App de Streaming Musical con FastAPI y Cloudinary."
+    description="Backend para App de Streaming Musical con FastAPI y Cloudinary.",
+    lifespan=lifespan,
+    # orjson en lugar de json + jsonable_encoder para todas las respuestas
+    default_response_class=FastJSONResponse
 )
 
+# El último añadido es el más externo: el 304/ETag se decide sobre el cuerpo
+# sin comprimir y la compresión se aplica al final
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Más externo todavía: la latencia medida incluye la compresión
+app.add_middleware(InstrumentationMiddleware)
+
 # Conectar todos los Routers
 app.include_router(users.router)
 app.include_router(artists.router)
 app.include_router(albums.router)
 app.include_router(songs.router)
 app.include_router(playlists.router)
+app.include_router(export.router)
+app.include_router(charts.router)
+app.include_router(search.router)
+app.include_router(autocomplete.router)
+app.include_router(ingest.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
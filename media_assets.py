@@ -0,0 +1,105 @@
+# media_assets.py
+# Registro de los archivos subidos por hash de contenido (sha256). Antes de subir
+# se calcula el hash leyendo el archivo y, si ya hay uno idéntico, se reutiliza su
+# URL sin transferir nada (ver uploads.upload_fileobj).
+#
+#   python media_assets.py backfill    registra los medios que ya están en el catálogo
+import hashlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy import select, union
+
+from database import SessionLocal
+from likes import insert_ignore
+from models import MediaAsset, Song, Album, Artist
+
+HASH_CHUNK_SIZE = 1024 * 1024
+BACKFILL_WORKERS = int(os.getenv("MEDIA_BACKFILL_WORKERS", "8"))
+
+# Columnas del catálogo que guardan URLs de medios
+MEDIA_COLUMNS = (Song.audio_path, Album.cover_url, Artist.artist_pic)
+
+
+class HashingWriter:
+    """Destino de copyfileobj que sólo calcula el hash y el tamaño."""
+
+    def __init__(self, target: Optional[BinaryIO] = None):
+        self.target = target
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        if self.target is not None:
+            self.target.write(data)
+        return len(data)
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+def content_hash(fileobj: BinaryIO) -> Tuple[str, int]:
+    """(sha256, tamaño) leyendo desde la posición actual; deja el archivo donde estaba."""
+    start = fileobj.tell()
+    writer = HashingWriter()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        writer.write(chunk)
+    fileobj.seek(start)
+    return writer.hexdigest(), writer.size
+
+
+def lookup(digest: str) -> Optional[str]:
+    with SessionLocal() as db:
+        return db.scalar(select(MediaAsset.url).where(MediaAsset.content_hash == digest))
+
+
+def register(digest: str, url: str, size: int) -> None:
+    """Si dos subidas idénticas coinciden en el tiempo, se queda la primera URL."""
+    with SessionLocal() as db:
+        db.execute(insert_ignore(db, MediaAsset).values(content_hash=digest, url=url, size=size))
+        db.commit()
+
+
+def _pending_urls(db) -> list:
+    known = select(MediaAsset.url)
+    urls = union(*(select(column.label("url")).where(column.is_not(None)) for column in MEDIA_COLUMNS)).subquery()
+    return list(db.scalars(select(urls.c.url).where(urls.c.url.not_in(known))))
+
+
+def backfill() -> Tuple[int, int]:
+    """Descarga y registra las URLs del catálogo que aún no están en media_assets. Devuelve (registradas, fallidas)."""
+    from audio_cache import HttpOrigin, OriginError
+
+    origin = HttpOrigin()
+
+    def fetch_hash(url: str):
+        writer = HashingWriter()
+        try:
+            origin.fetch(url, writer)
+        except OriginError as e:
+            print(f"  {e}", file=sys.stderr)
+            return url, None, 0
+        return url, writer.hexdigest(), writer.size
+
+    with SessionLocal() as db:
+        urls = _pending_urls(db)
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as pool:
+        for url, digest, size in pool.map(fetch_hash, urls):
+            if digest is None:
+                failed += 1
+                continue
+            register(digest, url, size)
+            done += 1
+    return done, failed
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        sys.exit("uso: python media_assets.py backfill")
+    registered, errors = backfill()
+    print(f"media_assets: {registered} archivos registrados, {errors} sin poder descargar")
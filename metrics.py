@@ -0,0 +1,36 @@
+# metrics.py
+# Primitivas de métricas en proceso (sin dependencias externas).
+import threading
+from bisect import bisect_left
+
+# Segundos; cubren desde una consulta local hasta un timeout del pool
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histograma de buckets fijos, seguro entre hilos."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Buckets acumulados al estilo Prometheus (`le` -> nº de observaciones <= le)."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, acc = {}, 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            acc += n
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = acc
+        return {"buckets": cumulative, "sum": total, "count": count}
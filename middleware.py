@@ -0,0 +1,245 @@
+# middleware.py
+# Middlewares ASGI de la app (ver main.py):
+#  - ConditionalGetMiddleware: ETag / Last-Modified y 304 para los GET.
+#  - CompressionMiddleware: br, zstd o gzip según Accept-Encoding. brotli y
+#    zstandard son opcionales (pip install brotli zstandard); gzip siempre está.
+import os
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+
+from cache import make_etag, etag_matches
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # dependencia opcional
+    zstandard = None
+
+# Orden de preferencia del servidor; se ignoran las que no estén instaladas
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",") if e.strip()]
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))   # 11 (por defecto en brotli) es demasiado lento por petición
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml", "image/svg+xml")
+
+
+class _Encoder:
+    """Interfaz común: compress() por trozo, flush() para emitir lo pendiente y finish() al final."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: cabecera gzip
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data) if self.encoding == "br" else self._c.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.flush()
+        if self.encoding == "zstd":
+            return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.finish() if self.encoding == "br" else self._c.flush()
+
+
+def _available(encoding: str) -> bool:
+    return encoding == "gzip" or (encoding == "br" and brotli is not None) or (encoding == "zstd" and zstandard is not None)
+
+
+def negotiate(accept_encoding: str, supported) -> str:
+    """Primera codificación del servidor aceptada por el cliente (q > 0), o "" si ninguna."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in supported:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas 2xx de tipos textuales. Las respuestas de un solo
+    mensaje por debajo de `minimum_size` se dejan tal cual; las de streaming
+    (p. ej. /export) se comprimen por trozos, vaciando el compresor en cada uno.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, encodings=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [e for e in (encodings or COMPRESSION_ENCODINGS) if _available(e)]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough:
+                return await send(message)
+            if message["type"] != "http.response.body":
+                # p. ej. http.response.pathsend (FileResponse zero-copy): no se toca
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                skip = (
+                    not 200 <= start["status"] < 300 or start["status"] in (204, 206)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                )
+                if skip:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                encoder = _Encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # El cuerpo ya no es byte a byte el mismo: el ETag pasa a ser débil
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(start)
+                else:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": compressed})
+
+            if more_body:
+                chunk = encoder.compress(body) + encoder.flush()
+            else:
+                chunk = encoder.compress(body) + encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, wrapped_send)
+
+
+class ConditionalGetMiddleware:
+    """
+    Para los GET con respuesta 200 completa (no streaming): usa el ETag que ya
+    traiga la respuesta (caché del catálogo) o lo calcula sobre el cuerpo, añade
+    Last-Modified y responde 304 si If-None-Match (o, sin él, If-Modified-Since)
+    indica que el cliente ya tiene esa versión.
+
+    No hay columnas de fecha de modificación: Last-Modified es el momento en que
+    este proceso vio cambiar el ETag de esa URL. Se guarda por URL y no por ETag:
+    si un recurso vuelve a un cuerpo anterior (like y unlike), eso también es un
+    cambio y no debe recuperar la fecha antigua. El validador principal es el ETag.
+    """
+
+    def __init__(self, app, max_tracked: int = 10000):
+        self.app = app
+        self.max_tracked = max_tracked
+        self._versions = OrderedDict()   # URL -> (ETag, Last-Modified)
+
+    def _last_modified(self, url: str, etag: str) -> float:
+        current = self._versions.get(url)
+        if current is not None and current[0] == etag:
+            self._versions.move_to_end(url)
+            return current[1]
+        now = float(int(time.time()))
+        # Segundos enteros: un cambio en el mismo segundo que el anterior también avanza
+        seen = max(now, current[1] + 1) if current is not None else now
+        self._versions[url] = (etag, seen)
+        self._versions.move_to_end(url)
+        while len(self._versions) > self.max_tracked:
+            self._versions.popitem(last=False)
+        return seen
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+        if "if-none-match" in request.headers:
+            return etag_matches(request, etag)
+        since = request.headers.get("if-modified-since")
+        if not since:
+            return False
+        try:
+            return last_modified <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough:
+                return await send(message)
+
+            if message["type"] != "http.response.body" or start["status"] != 200 or message.get("more_body", False):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            headers = MutableHeaders(raw=start["headers"])
+            etag = headers.get("etag") or make_etag(message.get("body", b""))
+            url = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+            last_modified = self._last_modified(url, etag.removeprefix("W/"))
+            headers["ETag"] = etag
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+            if self._not_modified(Request(scope), etag, last_modified):
+                for name in ("content-length", "content-type"):
+                    if name in headers:
+                        del headers[name]
+                start["status"] = 304
+                await send(start)
+                return await send({"type": "http.response.body", "body": b""})
+
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, wrapped_send)
@@ -0,0 +1,114 @@
+"""esquema original
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=150), nullable=True),
+        sa.Column("email", sa.String(length=150), nullable=False),
+        sa.Column("hashed_password", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "artist",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("country", sa.String(length=100), nullable=True),
+        sa.Column("artist_pic", sa.String(length=400), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_artist_id", "artist", ["id"])
+
+    op.create_table(
+        "album",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("category", sa.String(length=100), nullable=False),
+        sa.Column("cover_url", sa.String(length=300), nullable=True),
+        sa.Column("artist_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["artist_id"], ["artist.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_album_id", "album", ["id"])
+
+    op.create_table(
+        "song",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("duration", sa.String(length=20), nullable=True),
+        sa.Column("album_id", sa.Integer(), nullable=True),
+        sa.Column("artist_id", sa.Integer(), nullable=True),
+        sa.Column("audio_path", sa.String(length=500), nullable=True),
+        sa.ForeignKeyConstraint(["album_id"], ["album.id"]),
+        sa.ForeignKeyConstraint(["artist_id"], ["artist.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_song_id", "song", ["id"])
+
+    op.create_table(
+        "playlists",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_playlists_id", "playlists", ["id"])
+
+    op.create_table(
+        "playlist_songs",
+        sa.Column("playlist_id", sa.Integer(), nullable=False),
+        sa.Column("song_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["playlist_id"], ["playlists.id"]),
+        sa.ForeignKeyConstraint(["song_id"], ["song.id"]),
+        sa.PrimaryKeyConstraint("playlist_id", "song_id"),
+    )
+
+    op.create_table(
+        "likes",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("item_type", sa.String(length=50), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "item_type", "item_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("likes")
+    op.drop_table("playlist_songs")
+    op.drop_index("ix_playlists_id", table_name="playlists")
+    op.drop_table("playlists")
+    op.drop_index("ix_song_id", table_name="song")
+    op.drop_table("song")
+    op.drop_index("ix_album_id", table_name="album")
+    op.drop_table("album")
+    op.drop_index("ix_artist_id", table_name="artist")
+    op.drop_table("artist")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,86 @@
+"""upload_status, orden de playlists, like_counts e índices FULLTEXT
+
+Revision ID: 0002_catalog_features
+Revises: 0001_baseline
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002_catalog_features"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# tabla -> [(nombre, columnas)]; sólo MySQL tiene FULLTEXT (search.py)
+FULLTEXT_INDEXES = {
+    "song": [("ft_song_title", ["title"])],
+    "album": [("ft_album_text", ["title", "description"])],
+    "artist": [("ft_artist_text", ["name", "bio"])],
+}
+
+
+def _is_mysql() -> bool:
+    return op.get_bind().dialect.name == "mysql"
+
+
+def upgrade() -> None:
+    op.add_column("song", sa.Column("upload_status", sa.String(length=20), nullable=False, server_default="ready"))
+
+    # Posiciones densas 0..n-1; las filas existentes conservan el orden por song_id
+    op.add_column("playlist_songs", sa.Column("position", sa.Integer(), nullable=False, server_default="0"))
+    if _is_mysql():
+        # MySQL no permite leer en una subconsulta la tabla que se actualiza
+        op.execute(
+            "UPDATE playlist_songs ps JOIN ("
+            " SELECT playlist_id, song_id,"
+            " ROW_NUMBER() OVER (PARTITION BY playlist_id ORDER BY song_id) - 1 AS pos"
+            " FROM playlist_songs) r"
+            " ON r.playlist_id = ps.playlist_id AND r.song_id = ps.song_id"
+            " SET ps.position = r.pos"
+        )
+    else:
+        op.execute(
+            "UPDATE playlist_songs SET position = ("
+            " SELECT COUNT(*) FROM playlist_songs p2"
+            " WHERE p2.playlist_id = playlist_songs.playlist_id"
+            " AND p2.song_id < playlist_songs.song_id)"
+        )
+    op.create_index("ix_playlist_songs_position", "playlist_songs", ["playlist_id", "position"])
+
+    op.create_table(
+        "like_counts",
+        sa.Column("item_type", sa.String(length=50), nullable=False),
+        sa.Column("item_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("item_type", "item_id"),
+    )
+    op.create_index("ix_like_counts_rank", "like_counts", ["item_type", "count"])
+    # Igual que `python likes.py rebuild-counts`
+    op.execute(
+        "INSERT INTO like_counts (item_type, item_id, count)"
+        " SELECT item_type, item_id, COUNT(*) FROM likes GROUP BY item_type, item_id"
+    )
+
+    if _is_mysql():
+        for table, indexes in FULLTEXT_INDEXES.items():
+            for name, columns in indexes:
+                op.create_index(name, table, columns, mysql_prefix="FULLTEXT")
+
+
+def downgrade() -> None:
+    if _is_mysql():
+        for table, indexes in FULLTEXT_INDEXES.items():
+            for name, _ in indexes:
+                op.drop_index(name, table_name=table)
+    op.drop_index("ix_like_counts_rank", table_name="like_counts")
+    op.drop_table("like_counts")
+    op.drop_index("ix_playlist_songs_position", table_name="playlist_songs")
+    with op.batch_alter_table("playlist_songs") as batch:
+        batch.drop_column("position")
+    with op.batch_alter_table("song") as batch:
+        batch.drop_column("upload_status")
@@ -0,0 +1,43 @@
+"""índices en claves foráneas y en likes (item_type, item_id)
+
+Revision ID: 0003_foreign_key_indexes
+Revises: 0002_catalog_features
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0003_foreign_key_indexes"
+down_revision: Union[str, None] = "0002_catalog_features"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, tabla, columnas): mismos nombres que genera models.py.
+# InnoDB ya indexa por su cuenta las FK (y sustituye ese índice implícito por
+# éstos), así que en MySQL la ganancia real es ix_likes_item; SQLite no indexa
+# las FK y necesita todos.
+INDEXES = [
+    ("ix_song_album_id", "song", ["album_id"]),
+    ("ix_song_artist_id", "song", ["artist_id"]),
+    ("ix_album_artist_id", "album", ["artist_id"]),
+    ("ix_playlists_user_id", "playlists", ["user_id"]),
+    ("ix_playlist_songs_song_id", "playlist_songs", ["song_id"]),
+    ("ix_likes_item", "likes", ["item_type", "item_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    is_mysql = op.get_bind().dialect.name == "mysql"
+    for name, table, _ in reversed(INDEXES):
+        # MySQL no deja borrar el índice que respalda una FK
+        if is_mysql and name != "ix_likes_item":
+            continue
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,38 @@
+"""song_similarity y song_similarity_dirty (recomendaciones)
+
+Revision ID: 0004_song_similarity
+Revises: 0003_foreign_key_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004_song_similarity"
+down_revision: Union[str, None] = "0003_foreign_key_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "song_similarity",
+        sa.Column("song_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("similar_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("song_id", "rank"),
+    )
+    op.create_table(
+        "song_similarity_dirty",
+        sa.Column("song_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("song_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("song_similarity_dirty")
+    op.drop_table("song_similarity")
@@ -0,0 +1,33 @@
+"""media_assets: registro de archivos subidos por hash de contenido
+
+Revision ID: 0005_media_assets
+Revises: 0004_song_similarity
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005_media_assets"
+down_revision: Union[str, None] = "0004_song_similarity"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_assets",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("url", sa.String(length=500), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+    op.create_index("ix_media_assets_url", "media_assets", ["url"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_assets_url", table_name="media_assets")
+    op.drop_table("media_assets")
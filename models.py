@@ -8,11 +8,11 @@
 # from sqlalchemy import Column, Integer, String, Text, ForeignKey, create_engine, Table
 # from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
 # from passlib.context import CryptContext
-# from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table
+# from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, Index
 # from sqlalchemy.orm import relationship
 # from .database import Base
 
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 
 # Importación ABSOLUTA para la Base. 
@@ -22,7 +22,10 @@ from database import Base
 playlist_songs = Table(
     'playlist_songs', Base.metadata,
     Column('playlist_id', Integer, ForeignKey('playlists.id'), primary_key=True),  
-    Column('song_id', Integer, ForeignKey('song.id'), primary_key=True)            
+    Column('song_id', Integer, ForeignKey('song.id'), primary_key=True),
+    Column('position', Integer, nullable=False, default=0, server_default="0"),  # orden dentro de la playlist (0..n-1)
+    Index('ix_playlist_songs_position', 'playlist_id', 'position'),
+    Index('ix_playlist_songs_song_id', 'song_id')  # "¿en qué playlists está esta canción?"
 )
 
 class UserDB(Base):
@@ -45,6 +48,9 @@ class Artist(Base):
     albums = relationship("Album", back_populates="artist")
     songs = relationship("Song", back_populates="artist")
 
+    # Búsqueda (search.py): sólo MySQL tiene índices FULLTEXT
+    __table_args__ = (Index("ft_artist_text", "name", "bio", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),)
+
 class Album(Base):
     __tablename__ = "album"
     id = Column(Integer, primary_key=True, index=True)
@@ -52,32 +58,39 @@ class Album(Base):
     description = Column(Text, nullable=True)
     category = Column(String(100), nullable=False)
     cover_url = Column(String(300), nullable=True)
-    artist_id = Column(Integer, ForeignKey("artist.id"))
+    artist_id = Column(Integer, ForeignKey("artist.id"), index=True)
     
     artist = relationship("Artist", back_populates="albums")
-    songs = relationship("Song", back_populates="album")
+    songs = relationship("Song", back_populates="album", order_by="Song.id")  # orden de la tracklist
+
+    __table_args__ = (Index("ft_album_text", "title", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),)
 
 class Song(Base):
     __tablename__ = "song"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     duration = Column(String(20), nullable=True)
-    album_id = Column(Integer, ForeignKey("album.id"), nullable=True)
-    artist_id = Column(Integer, ForeignKey("artist.id"), nullable=True)
+    album_id = Column(Integer, ForeignKey("album.id"), nullable=True, index=True)
+    artist_id = Column(Integer, ForeignKey("artist.id"), nullable=True, index=True)
     audio_path = Column(String(500), nullable=True) # URL de Cloudinary
+    # "ready", o "pending"/"failed" mientras la subida asíncrona no termina
+    upload_status = Column(String(20), nullable=False, default="ready", server_default="ready")
     
     album = relationship("Album", back_populates="songs")
     artist = relationship("Artist", back_populates="songs")
     playlists = relationship("Playlist", secondary=playlist_songs, back_populates="songs")
 
+    __table_args__ = (Index("ft_song_title", "title", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),)
+
 class Playlist(Base):
     __tablename__ = "playlists"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     
     owner = relationship("UserDB", back_populates="playlists")
-    songs = relationship("Song", secondary=playlist_songs, back_populates="playlists")
+    songs = relationship("Song", secondary=playlist_songs, back_populates="playlists",
+                         order_by=playlist_songs.c.position)
 
 class Like(Base):
     __tablename__ = "likes"
@@ -85,4 +98,38 @@ class Like(Base):
     item_type = Column(String(50), primary_key=True) # "artist", "album", "song"
     item_id = Column(Integer, primary_key=True)
 
+    # "¿quién ha dado like a esto?": la PK empieza por user_id y no sirve
+    __table_args__ = (Index("ix_likes_item", "item_type", "item_id"),)
+
+class LikeCount(Base):
+    # Contador desnormalizado de likes por elemento (se mantiene junto con `likes`)
+    __tablename__ = "like_counts"
+    item_type = Column(String(50), primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Ranking por tipo: el top-N es un recorrido del índice, sin GROUP BY sobre likes
+    __table_args__ = (Index("ix_like_counts_rank", "item_type", "count"),)
+
+
+class SongSimilarity(Base):
+    # Vecinos precalculados por recommendations.py: top-k por canción, en orden
+    __tablename__ = "song_similarity"
+    song_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    similar_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+
+class SongSimilarityDirty(Base):
+    # Canciones cuyos likes/playlists han cambiado desde el último cálculo
+    __tablename__ = "song_similarity_dirty"
+    song_id = Column(Integer, primary_key=True)
+
 
+class MediaAsset(Base):
+    # Archivos ya subidos, por sha256 del contenido (ver media_assets.py)
+    __tablename__ = "media_assets"
+    content_hash = Column(String(64), primary_key=True)
+    url = Column(String(500), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
@@ -0,0 +1,105 @@
+# pagination.py
+# Paginación por cursor (keyset) y proyección de campos para los listados del catálogo.
+import base64
+import binascii
+import json
+import os
+from typing import Optional, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from responses import FastJSONResponse, rows_to_dicts
+
+DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+
+
+class PageParams(BaseModel):
+    cursor: Optional[str] = None
+    limit: int = DEFAULT_LIMIT
+    fields: Optional[str] = None
+    full_dump: bool = False
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto como next_cursor"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, description=f"Máximo {MAX_LIMIT} elementos por página"),
+    fields: Optional[str] = Query(None, description="Columnas separadas por coma, p. ej. id,title"),
+    full_dump: bool = Query(False, alias="all", description="Devuelve la tabla completa sin paginar"),
+) -> PageParams:
+    """Dependencia común para los endpoints de listado."""
+    return PageParams(cursor=cursor, limit=min(limit, MAX_LIMIT), fields=fields, full_dump=full_dump)
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def select_columns(model, schema: Type[BaseModel], fields: Optional[str]):
+    """
+    Traduce `fields=` a columnas del modelo. Sólo se permiten los campos del
+    esquema de salida, y el `id` se incluye siempre porque lo necesita el cursor.
+    """
+    allowed = list(schema.model_fields)
+    if not fields:
+        names = allowed
+    else:
+        names = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [n for n in names if n not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(unknown)}")
+        if "id" not in names:
+            names.insert(0, "id")
+    return [getattr(model, n) for n in names]
+
+
+def parse_expand(expand: Optional[str], allowed) -> list:
+    """`?expand=songs,albums` -> ["albums", "songs"] (orden canónico, para la clave de caché)."""
+    if not expand:
+        return []
+    names = {e.strip() for e in expand.split(",") if e.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Expansiones no válidas: {', '.join(sorted(unknown))}")
+    return sorted(names)
+
+
+async def paginate(db: AsyncSession, model, schema: Type[BaseModel], params: PageParams) -> dict:
+    """
+    Devuelve una página `{"items": [...], "next_cursor": ...}` ordenada por `id`.
+    Sólo se leen de la BD las columnas pedidas; las filas no pasan por el ORM
+    ni por Pydantic: los dicts salen directamente de las tuplas.
+    """
+    columns = select_columns(model, schema, params.fields)
+    stmt = select(*columns).order_by(model.id).limit(params.limit + 1)
+    if params.cursor:
+        stmt = stmt.where(model.id > decode_cursor(params.cursor))
+
+    rows = rows_to_dicts(await db.execute(stmt))
+    has_more = len(rows) > params.limit
+    items = rows[:params.limit]
+    next_cursor = encode_cursor(items[-1]["id"]) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def full_dump(db: AsyncSession, model, schema: Type[BaseModel], params: PageParams) -> FastJSONResponse:
+    """
+    Comportamiento anterior (tabla completa); sólo accesible con `?all=true`.
+    Se devuelve ya serializado: es una lista, no la página del `response_model`.
+    """
+    columns = select_columns(model, schema, params.fields)
+    result = await db.execute(select(*columns).order_by(model.id))
+    return FastJSONResponse(rows_to_dicts(result))
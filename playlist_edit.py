@@ -0,0 +1,131 @@
+# playlist_edit.py
+# Edición de playlists ordenadas (columna `position` de playlist_songs).
+#
+# Las posiciones son densas (0..n-1). Añadir al final es un INSERT; el resto de
+# ediciones leen sólo los song_id ordenados (enteros, nunca filas de Song),
+# calculan el orden nuevo y reescriben el sufijo que cambia con un DELETE y un
+# INSERT multi-fila, sea cual sea el tamaño de la playlist.
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Song, playlist_songs
+
+INSERT_CHUNK_SIZE = 1000
+
+
+async def contains(db: AsyncSession, playlist_id: int, song_id: int) -> bool:
+    """Comprobación por clave primaria compuesta, sin cargar la colección."""
+    found = await db.execute(
+        select(playlist_songs.c.song_id).where(
+            playlist_songs.c.playlist_id == playlist_id,
+            playlist_songs.c.song_id == song_id,
+        )
+    )
+    return found.first() is not None
+
+
+async def _ordered_song_ids(db: AsyncSession, playlist_id: int) -> List[int]:
+    result = await db.execute(
+        select(playlist_songs.c.song_id)
+        .where(playlist_songs.c.playlist_id == playlist_id)
+        .order_by(playlist_songs.c.position)
+    )
+    return list(result.scalars())
+
+
+async def _insert_rows(db: AsyncSession, playlist_id: int, song_ids: Sequence[int], start: int) -> None:
+    rows = [
+        {"playlist_id": playlist_id, "song_id": song_id, "position": start + i}
+        for i, song_id in enumerate(song_ids)
+    ]
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await db.execute(insert(playlist_songs).values(rows[i:i + INSERT_CHUNK_SIZE]))
+
+
+async def _rewrite(db: AsyncSession, playlist_id: int, old: List[int], new: List[int]) -> None:
+    """Persiste `new` tocando sólo desde la primera posición que difiere de `old`."""
+    first = 0
+    while first < min(len(old), len(new)) and old[first] == new[first]:
+        first += 1
+    if first == len(old) == len(new):
+        return
+    await db.execute(
+        delete(playlist_songs).where(
+            playlist_songs.c.playlist_id == playlist_id,
+            playlist_songs.c.position >= first,
+        )
+    )
+    await _insert_rows(db, playlist_id, new[first:], first)
+
+
+async def existing_songs(db: AsyncSession, song_ids: Iterable[int]) -> set:
+    ids = list(set(song_ids))
+    if not ids:
+        return set()
+    return set((await db.execute(select(Song.id).where(Song.id.in_(ids)))).scalars())
+
+
+async def add_songs(db: AsyncSession, playlist_id: int, song_ids: Sequence[int], position: Optional[int] = None) -> Tuple[List[int], List[int]]:
+    """
+    Añade canciones (en el orden dado) al final o a partir de `position`.
+    Devuelve (añadidas, ignoradas): se ignoran las que no existen o ya estaban.
+    No hace commit.
+    """
+    valid = await existing_songs(db, song_ids)
+    requested, seen = [], set()
+    for song_id in song_ids:
+        if song_id in valid and song_id not in seen:
+            requested.append(song_id)
+            seen.add(song_id)
+
+    present = set()
+    if requested:
+        present = set((await db.execute(
+            select(playlist_songs.c.song_id).where(
+                playlist_songs.c.playlist_id == playlist_id,
+                playlist_songs.c.song_id.in_(requested),
+            )
+        )).scalars())
+    to_add = [s for s in requested if s not in present]
+    ignored = [s for s in song_ids if s not in to_add]
+    if not to_add:
+        return [], ignored
+
+    if position is None:
+        # Caso habitual: añadir al final sin leer la playlist (índice playlist_id, position)
+        last = await db.scalar(
+            select(func.max(playlist_songs.c.position)).where(playlist_songs.c.playlist_id == playlist_id)
+        )
+        await _insert_rows(db, playlist_id, to_add, 0 if last is None else last + 1)
+    else:
+        old = await _ordered_song_ids(db, playlist_id)
+        index = max(0, min(position, len(old)))
+        await _rewrite(db, playlist_id, old, old[:index] + to_add + old[index:])
+    return to_add, ignored
+
+
+async def remove_songs(db: AsyncSession, playlist_id: int, song_ids: Iterable[int]) -> List[int]:
+    """Quita canciones y compacta las posiciones. No hace commit."""
+    drop = set(song_ids)
+    old = await _ordered_song_ids(db, playlist_id)
+    new = [s for s in old if s not in drop]
+    await _rewrite(db, playlist_id, old, new)
+    return [s for s in old if s in drop]
+
+
+async def move_songs(db: AsyncSession, playlist_id: int, moves: Sequence[Tuple[int, int]]) -> List[int]:
+    """
+    Aplica movimientos (song_id, posición destino) en orden, sobre la lista en
+    memoria, y escribe el resultado una sola vez. No hace commit.
+    """
+    old = await _ordered_song_ids(db, playlist_id)
+    new = list(old)
+    for song_id, target in moves:
+        if song_id not in new:
+            continue
+        new.remove(song_id)
+        new.insert(max(0, min(target, len(new))), song_id)
+    await _rewrite(db, playlist_id, old, new)
+    return new
@@ -0,0 +1,305 @@
+# recommendations.py
+# "Canciones similares" precalculadas a partir de likes y playlists.
+#
+# Cada usuario (sus likes de canciones) y cada playlist es una cesta. La
+# similitud entre dos canciones es el coseno de sus columnas en la matriz
+# dispersa cestas x canciones, atenuado cuando coinciden en pocas cestas. Se
+# guardan los RECS_TOP_K vecinos de cada canción en `song_similarity`; la API
+# sólo lee esa tabla.
+#
+# El cálculo por lotes necesita numpy y scipy (pip install numpy scipy):
+#   python recommendations.py build      recálculo completo
+#   python recommendations.py refresh    sólo las canciones marcadas en song_similarity_dirty
+import os
+import sys
+import time
+from typing import Iterable, List
+
+from sqlalchemy import Float, delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from likes import insert_ignore
+from models import Like, LikeCount, Playlist, Song, SongSimilarity, SongSimilarityDirty, playlist_songs
+from schemas import SongOut
+
+RECS_TOP_K = int(os.getenv("RECS_TOP_K", "50"))
+RECS_LIKE_WEIGHT = float(os.getenv("RECS_LIKE_WEIGHT", "1.0"))
+RECS_PLAYLIST_WEIGHT = float(os.getenv("RECS_PLAYLIST_WEIGHT", "1.0"))
+# coseno * n / (n + SHRINKAGE), n = co-ocurrencias: compartir una sola cesta no es "muy similar"
+RECS_SHRINKAGE = float(os.getenv("RECS_SHRINKAGE", "2.0"))
+RECS_BLOCK_SIZE = int(os.getenv("RECS_BLOCK_SIZE", "2000"))     # canciones por producto de matrices
+RECS_READ_CHUNK = int(os.getenv("RECS_READ_CHUNK", "100000"))   # filas por lote al leer la BD
+RECS_MAX_SEEDS = int(os.getenv("RECS_MAX_SEEDS", "200"))        # canciones del usuario que se usan como semilla
+IN_CHUNK_SIZE = 5000
+
+
+# LECTURA (API)
+
+def _song_columns():
+    return [getattr(Song, name) for name in SongOut.model_fields]
+
+
+async def mark_dirty(db: AsyncSession, song_ids: Iterable[int]) -> None:
+    """Marca canciones para el próximo `refresh`. No hace commit."""
+    rows = [{"song_id": song_id} for song_id in set(song_ids)]
+    for i in range(0, len(rows), IN_CHUNK_SIZE):
+        await db.execute(insert_ignore(db, SongSimilarityDirty).values(rows[i:i + IN_CHUNK_SIZE]))
+
+
+async def similar_to(db: AsyncSession, song_id: int, limit: int) -> List[dict]:
+    """Vecinos precalculados de una canción, del más al menos similar."""
+    stmt = (
+        select(*_song_columns(), SongSimilarity.score)
+        .join(Song, Song.id == SongSimilarity.similar_id)
+        .where(SongSimilarity.song_id == song_id)
+        .order_by(SongSimilarity.rank)
+        .limit(limit)
+    )
+    return [dict(row) for row in (await db.execute(stmt)).mappings()]
+
+
+def _user_songs(user_id: int):
+    """Canciones con like del usuario y canciones de sus playlists."""
+    return union_all(
+        select(Like.item_id.label("song_id")).where(Like.user_id == user_id, Like.item_type == "song"),
+        select(playlist_songs.c.song_id)
+        .join(Playlist, Playlist.id == playlist_songs.c.playlist_id)
+        .where(Playlist.user_id == user_id),
+    ).subquery()
+
+
+async def for_user(db: AsyncSession, user_id: int, limit: int) -> List[dict]:
+    """
+    Suma los scores de los vecinos de las canciones del usuario y descarta las
+    que ya tiene, en una sola consulta. Sin historial (o sin vecinos
+    calculados) se recurre a las canciones con más likes, con score 0.
+    """
+    own = _user_songs(user_id)
+    # Tabla derivada: MySQL no admite LIMIT dentro de IN (subconsulta)
+    seeds = select(own.c.song_id).distinct().limit(RECS_MAX_SEEDS).subquery()
+    score = func.sum(SongSimilarity.score).label("score")
+    ranked = (
+        select(SongSimilarity.similar_id, score)
+        .where(
+            SongSimilarity.song_id.in_(select(seeds.c.song_id)),
+            SongSimilarity.similar_id.not_in(select(own.c.song_id)),
+        )
+        .group_by(SongSimilarity.similar_id)
+        .order_by(score.desc())
+        .limit(limit)
+        .subquery()
+    )
+    stmt = (
+        select(*_song_columns(), ranked.c.score)
+        .join(Song, Song.id == ranked.c.similar_id)
+        .order_by(ranked.c.score.desc())
+    )
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings()]
+    if rows:
+        return rows
+
+    popular = (
+        select(*_song_columns(), literal(0.0, Float).label("score"))
+        .join(LikeCount, (LikeCount.item_type == "song") & (LikeCount.item_id == Song.id))
+        .where(Song.id.not_in(select(own.c.song_id)))
+        .order_by(LikeCount.count.desc())
+        .limit(limit)
+    )
+    return [dict(row) for row in (await db.execute(popular)).mappings()]
+
+
+# CÁLCULO POR LOTES (numpy + scipy)
+
+def _require_scipy():
+    try:
+        import numpy
+        import scipy.sparse
+    except ImportError:
+        sys.exit("El cálculo de similitudes necesita numpy y scipy: pip install numpy scipy")
+    return numpy, scipy.sparse
+
+
+def _read_pairs(db: Session, stmt, np):
+    """(cesta, canción) en arrays int64, leyendo la BD por lotes."""
+    baskets, songs = [], []
+    result = db.execute(stmt.execution_options(yield_per=RECS_READ_CHUNK))
+    for batch in result.partitions():
+        pairs = np.array(batch, dtype=np.int64).reshape(-1, 2)
+        baskets.append(pairs[:, 0])
+        songs.append(pairs[:, 1])
+    empty = np.empty(0, dtype=np.int64)
+    return (np.concatenate(baskets) if baskets else empty), (np.concatenate(songs) if songs else empty)
+
+
+def _basket_matrix(db: Session, like_users=None, playlist_ids=None):
+    """
+    Matriz cestas x canciones (CSR, float32). Las filas de likes y de playlists
+    se numeran por separado; con like_users / playlist_ids (subconsultas) sólo
+    se leen esas cestas. Devuelve (matriz, ids de canción de cada columna).
+    """
+    np, sp = _require_scipy()
+    likes_stmt = select(Like.user_id, Like.item_id).where(Like.item_type == "song")
+    if like_users is not None:
+        likes_stmt = likes_stmt.where(Like.user_id.in_(like_users))
+    playlists_stmt = select(playlist_songs.c.playlist_id, playlist_songs.c.song_id)
+    if playlist_ids is not None:
+        playlists_stmt = playlists_stmt.where(playlist_songs.c.playlist_id.in_(playlist_ids))
+
+    like_baskets, like_songs = _read_pairs(db, likes_stmt, np)
+    pl_baskets, pl_songs = _read_pairs(db, playlists_stmt, np)
+
+    _, like_rows = np.unique(like_baskets, return_inverse=True)
+    _, pl_rows = np.unique(pl_baskets, return_inverse=True)
+    n_like_rows = int(like_rows.max()) + 1 if like_rows.size else 0
+    rows = np.concatenate([like_rows, pl_rows + n_like_rows])
+    song_ids, cols = np.unique(np.concatenate([like_songs, pl_songs]), return_inverse=True)
+    data = np.concatenate([
+        np.full(like_rows.size, RECS_LIKE_WEIGHT, dtype=np.float32),
+        np.full(pl_rows.size, RECS_PLAYLIST_WEIGHT, dtype=np.float32),
+    ])
+    n_rows = n_like_rows + (int(pl_rows.max()) + 1 if pl_rows.size else 0)
+    matrix = sp.csr_matrix((data, (rows, cols)), shape=(n_rows, song_ids.size))
+    matrix.sum_duplicates()
+    return matrix, song_ids
+
+
+def _global_sq_norms(db: Session, song_ids):
+    """
+    ||columna||² de cada canción sobre TODAS las cestas, para el refresco
+    incremental (la submatriz sólo tiene las cestas afectadas): una canción
+    aparece como mucho una vez por usuario y por playlist, así que basta contar.
+    """
+    np, _ = _require_scipy()
+    position = {int(s): i for i, s in enumerate(song_ids)}
+    norms = np.zeros(len(song_ids), dtype=np.float64)
+    ids = list(position)
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[i:i + IN_CHUNK_SIZE]
+        for song_id, n in db.execute(
+            select(LikeCount.item_id, LikeCount.count).where(LikeCount.item_type == "song", LikeCount.item_id.in_(chunk))
+        ):
+            norms[position[song_id]] += RECS_LIKE_WEIGHT ** 2 * n
+        for song_id, n in db.execute(
+            select(playlist_songs.c.song_id, func.count())
+            .where(playlist_songs.c.song_id.in_(chunk))
+            .group_by(playlist_songs.c.song_id)
+        ):
+            norms[position[song_id]] += RECS_PLAYLIST_WEIGHT ** 2 * n
+    return norms
+
+
+def _top_neighbors(matrix, song_ids, targets, sq_norms):
+    """
+    Para las columnas `targets`, top-k por coseno. Se procesa por bloques de
+    RECS_BLOCK_SIZE canciones: el producto (bloque x canciones) es lo único que
+    crece con el catálogo. Genera (song_id, [(similar_id, score), ...]).
+    """
+    np, _ = _require_scipy()
+    by_song = matrix.T.tocsr()          # canciones x cestas
+    norms = np.sqrt(np.maximum(sq_norms, 1e-12))
+
+    for start in range(0, len(targets), RECS_BLOCK_SIZE):
+        block = targets[start:start + RECS_BLOCK_SIZE]
+        co = (by_song[block] @ matrix).tocsr()
+        for i, col in enumerate(block):
+            lo, hi = co.indptr[i], co.indptr[i + 1]
+            neighbors, values = co.indices[lo:hi], co.data[lo:hi]
+            keep = neighbors != col
+            neighbors, values = neighbors[keep], values[keep]
+            if neighbors.size == 0:
+                yield int(song_ids[col]), []
+                continue
+            scores = values / (norms[col] * norms[neighbors]) * (values / (values + RECS_SHRINKAGE))
+            k = min(RECS_TOP_K, scores.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            yield int(song_ids[col]), [(int(song_ids[neighbors[j]]), float(scores[j])) for j in top]
+
+
+def _write(db: Session, results) -> int:
+    """Sustituye los vecinos de cada canción; commit por bloque (la API nunca ve una canción a medias)."""
+    written = 0
+    pending_ids, pending_rows = [], []
+
+    def flush():
+        for i in range(0, len(pending_ids), IN_CHUNK_SIZE):
+            db.execute(delete(SongSimilarity).where(SongSimilarity.song_id.in_(pending_ids[i:i + IN_CHUNK_SIZE])))
+        for i in range(0, len(pending_rows), IN_CHUNK_SIZE):
+            db.execute(insert(SongSimilarity), pending_rows[i:i + IN_CHUNK_SIZE])
+        db.commit()
+
+    for song_id, neighbors in results:
+        pending_ids.append(song_id)
+        pending_rows.extend(
+            {"song_id": song_id, "rank": rank, "similar_id": similar_id, "score": score}
+            for rank, (similar_id, score) in enumerate(neighbors)
+        )
+        written += 1
+        if len(pending_ids) >= RECS_BLOCK_SIZE:
+            flush()
+            pending_ids, pending_rows = [], []
+    flush()
+    return written
+
+
+def _clear_dirty(db: Session, song_ids) -> None:
+    song_ids = list(song_ids)
+    for i in range(0, len(song_ids), IN_CHUNK_SIZE):
+        db.execute(delete(SongSimilarityDirty).where(SongSimilarityDirty.song_id.in_(song_ids[i:i + IN_CHUNK_SIZE])))
+    db.commit()
+
+
+def build(db: Session) -> int:
+    """Recálculo completo. Devuelve el nº de canciones con vecinos actualizados."""
+    np, _ = _require_scipy()
+    dirty = list(db.scalars(select(SongSimilarityDirty.song_id)))
+    matrix, song_ids = _basket_matrix(db)
+    sq_norms = np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()
+    written = _write(db, _top_neighbors(matrix, song_ids, np.arange(song_ids.size), sq_norms))
+
+    # Canciones que ya no están en ninguna cesta: fuera sus vecinos antiguos
+    computed = set(song_ids.tolist())
+    stale = [s for s in db.scalars(select(SongSimilarity.song_id).distinct()) if s not in computed]
+    for i in range(0, len(stale), IN_CHUNK_SIZE):
+        db.execute(delete(SongSimilarity).where(SongSimilarity.song_id.in_(stale[i:i + IN_CHUNK_SIZE])))
+    db.commit()
+    # Sólo las marcas leídas al principio: las posteriores quedan para el próximo refresh
+    _clear_dirty(db, dirty)
+    return written
+
+
+def refresh(db: Session) -> int:
+    """
+    Recalcula sólo las canciones marcadas: basta con las cestas que las
+    contienen (índices ix_likes_item e ix_playlist_songs_song_id). Los vecinos
+    de las demás canciones se corrigen en el siguiente `build`.
+    """
+    np, _ = _require_scipy()
+    dirty = list(db.scalars(select(SongSimilarityDirty.song_id)))
+    if not dirty:
+        return 0
+    written = 0
+    for i in range(0, len(dirty), IN_CHUNK_SIZE):
+        chunk = dirty[i:i + IN_CHUNK_SIZE]
+        like_users = select(Like.user_id).where(Like.item_type == "song", Like.item_id.in_(chunk))
+        playlist_ids = select(playlist_songs.c.playlist_id).where(playlist_songs.c.song_id.in_(chunk))
+        matrix, song_ids = _basket_matrix(db, like_users, playlist_ids)
+        targets = np.flatnonzero(np.isin(song_ids, chunk))
+        written += _write(db, _top_neighbors(matrix, song_ids, targets, _global_sq_norms(db, song_ids)))
+        # Sin cestas (se quitaron todos sus likes/playlists): sin vecinos
+        orphans = sorted(set(chunk) - set(song_ids.tolist()))
+        written += _write(db, ((song_id, []) for song_id in orphans))
+        _clear_dirty(db, chunk)
+    return written
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    if sys.argv[1:] not in (["build"], ["refresh"]):
+        sys.exit("uso: python recommendations.py build|refresh")
+    started = time.perf_counter()
+    with SessionLocal() as session:
+        n = build(session) if sys.argv[1] == "build" else refresh(session)
+    print(f"song_similarity: {n} canciones actualizadas en {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,104 @@
+# replicas.py
+# Réparto de lecturas entre réplicas de sólo lectura (DATABASE_REPLICA_URLS).
+#
+# Las rutas GET piden la sesión con get_read_db (database.py), que elige una
+# réplica sana por round-robin o por menos sesiones abiertas. Una réplica que
+# falla queda apartada REPLICA_RETRY_SECONDS y, si no queda ninguna, se lee del
+# primario. Tras una escritura (like, canción añadida a una playlist...) las
+# lecturas de ese usuario o playlist van al primario durante REPLICA_STICKY_SECONDS,
+# para que quien escribe vea su cambio aunque la réplica vaya con retraso.
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlalchemy import event
+
+REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin")   # round_robin | least_connections
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Debe cubrir el retraso de replicación habitual
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+MAX_STICKY_KEYS = 100000
+
+if REPLICA_STRATEGY not in ("round_robin", "least_connections"):
+    raise ValueError(f"REPLICA_STRATEGY inválido: {REPLICA_STRATEGY}")
+
+logger = logging.getLogger("musicapi.db")
+
+
+class Replica:
+    def __init__(self, name: str, engine, sessionmaker):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = sessionmaker
+        self.in_use = 0
+        self.sessions = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], strategy: str = REPLICA_STRATEGY):
+        self.replicas = replicas
+        self.strategy = strategy
+        self._rr = itertools.count()
+        self._sticky = OrderedDict()   # (tipo, id) -> instante hasta el que se lee del primario
+        self._lock = threading.Lock()
+        for replica in replicas:
+            self._watch(replica)
+
+    def _watch(self, replica: Replica) -> None:
+        """Las desconexiones a mitad de petición también apartan la réplica."""
+
+        @event.listens_for(replica.engine.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_down(replica, context.original_exception)
+
+    def choose(self, exclude=()) -> Optional[Replica]:
+        candidates = [r for r in self.replicas if r.healthy and r not in exclude]
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda r: r.in_use)
+        return candidates[next(self._rr) % len(candidates)]
+
+    def mark_down(self, replica: Replica, error) -> None:
+        if not replica.healthy:
+            return  # ya apartada (handle_error y get_read_db pueden avisar del mismo fallo)
+        replica.failures += 1
+        replica.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        logger.warning("réplica %s apartada %ss: %s", replica.name, REPLICA_RETRY_SECONDS, error)
+
+    def mark_written(self, kind: str, item_id: Optional[int]) -> None:
+        """Las lecturas de (kind, item_id) irán al primario durante un rato."""
+        if not self.replicas:
+            return
+        with self._lock:
+            self._sticky[(kind, item_id)] = time.monotonic() + REPLICA_STICKY_SECONDS
+            self._sticky.move_to_end((kind, item_id))
+            while len(self._sticky) > MAX_STICKY_KEYS:
+                self._sticky.popitem(last=False)
+
+    def mark_created(self, kind: str, item_id: int) -> None:
+        """Como mark_written, y además los listados de `kind` (ver database.LIST_ROUTES)."""
+        self.mark_written(kind, item_id)
+        self.mark_written(kind, None)
+
+    def is_sticky(self, kind: str, item_id: Optional[int]) -> bool:
+        until = self._sticky.get((kind, item_id))
+        return until is not None and until > time.monotonic()
+
+    def stats(self) -> List[dict]:
+        return [
+            {"name": r.name, "healthy": r.healthy, "in_use": r.in_use,
+             "sessions": r.sessions, "failures": r.failures}
+            for r in self.replicas
+        ]
@@ -0,0 +1,40 @@
+# responses.py
+# Serialización JSON de las respuestas: orjson si está instalado, json estándar si no.
+# Los listados se construyen como dicts a partir de tuplas de filas (sin ORM ni
+# reflexión de jsonable_encoder) y se devuelven ya serializados.
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+
+def _default(obj):
+    # orjson no conoce los modelos de Pydantic; el resto va al encoder de FastAPI
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return jsonable_encoder(obj)
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """Clase de respuesta por defecto de la app (ver main.py)."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(result) -> list:
+    """Filas de un Result (tuplas) -> dicts, leyendo los nombres de columna una sola vez."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -0,0 +1,61 @@
+# routers/admin.py
+# Endpoints internos de operación (estado del pool, etc.)
+import os
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from db_pool import pool_stats
+from cache import cache
+from audio_cache import get_audio_cache
+from database import replicas
+from schemas import PoolStats, CacheStats, StreamCacheStats, ReplicaStatus
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Si ADMIN_TOKEN está definido, exige la cabecera X-Admin-Token."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Para los endpoints que escriben (p. ej. /ingest): sin ADMIN_TOKEN definido, cerrados."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Define ADMIN_TOKEN para habilitar este endpoint")
+    require_admin(x_admin_token)
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Administración"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/pool", response_model=Dict[str, PoolStats])
+def get_pool_stats():
+    """
+    Estadísticas de los pools de conexiones: conexiones en uso, overflow,
+    timeouts, pings e histograma del tiempo de espera en el checkout.
+    """
+    return pool_stats()
+
+
+@router.get("/cache", response_model=CacheStats)
+def get_cache_stats():
+    """Aciertos, fallos y respuestas 304 de la caché del catálogo."""
+    return cache.stats()
+
+
+@router.get("/stream-cache", response_model=StreamCacheStats)
+def get_stream_cache_stats():
+    """Ocupación y aciertos de la caché en disco de /songs/{id}/stream."""
+    return get_audio_cache().stats()
+
+
+@router.get("/replicas", response_model=List[ReplicaStatus])
+def get_replicas():
+    """Estado de las réplicas de lectura (vacío si no hay DATABASE_REPLICA_URLS)."""
+    return replicas.stats()
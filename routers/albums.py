@@ -1,13 +1,19 @@
 # routers/albums.py
-from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile, Request, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 from typing import List, Optional
 
 # Importaciones de módulos locales
-from database import get_db
-from models import Album
-from schemas import AlbumCreate # Lo usamos como referencia para los campos
-from utils import upload_file_to_cloudinary
+from database import get_db, get_read_db, replicas
+from models import Album, Song
+from schemas import AlbumCreate, AlbumOut, AlbumDetail, TrackOut, Page # Lo usamos como referencia para los campos
+from pagination import PageParams, page_params, paginate, full_dump, parse_expand
+from uploads import upload_media
+from cache import cache
+from search import search_index
+from autocomplete import autocomplete_index
 
 # 1. Definición del Router
 router = APIRouter(
@@ -15,8 +21,8 @@ router = APIRouter(
     tags=["Álbumes"]
 )
 
-@router.post("/")
-def create_album(
+@router.post("/", response_model=AlbumOut)
+async def create_album(
     # --- Parámetros de Texto (Form) ---
     title: str = Form(...),
     description: str = Form(None),
@@ -27,7 +33,7 @@ def create_album(
 
     cover_file: UploadFile = File(None), 
 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crea un nuevo álbum. Acepta un archivo subido o un link URL.
@@ -37,7 +43,7 @@ def create_album(
     
     if cover_file and cover_file.filename:
         
-        final_cover_url = upload_file_to_cloudinary(cover_file, folder="music_app_album_covers")
+        final_cover_url = await upload_media(cover_file, "music_app_album_covers")
         
         if not final_cover_url:
             raise HTTPException(500, "Error al subir la portada del álbum a Cloudinary")
@@ -56,20 +62,58 @@ def create_album(
     )
 
     db.add(a)
-    db.commit()
-    db.refresh(a)
+    await db.commit()
+    await db.refresh(a)
+    replicas.mark_created("album", a.id)
+    await cache.invalidate("albums")
+    search_index.add("album", a.id, a)
+    autocomplete_index.add("album", a.id, a.title)
     return a
 
-@router.get("/")
-def get_albums(db: Session = Depends(get_db)):
-    return db.query(Album).all()
+@router.get("/", response_model=Page[AlbumOut])
+async def get_albums(request: Request, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
+    """
+    Lista paginada de álbumes (`?cursor=&limit=&fields=`).
+    La tabla completa sólo se devuelve con `?all=true`.
+    """
+    if page.full_dump:
+        return await full_dump(db, Album, AlbumOut, page)
+    key = await cache.list_key("albums", page.cursor, page.limit, page.fields)
+    return await cache.respond(request, key, lambda: paginate(db, Album, AlbumOut, page))
 
-@router.get("/{album_id}")
-def get_album_by_id(album_id: int, db: Session = Depends(get_db)):
+@router.get("/{album_id}", response_model=AlbumDetail)
+async def get_album_by_id(
+    album_id: int,
+    request: Request,
+    expand: Optional[str] = Query(None, description="songs: incluye la tracklist"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Obtiene los detalles de un álbum por su ID.
+    Obtiene los detalles de un álbum por su ID. Con `?expand=songs` incluye
+    la tracklist ordenada (una sola consulta extra, sólo con las columnas de TrackOut).
     """
-    album = db.query(Album).get(album_id)
-    if not album:
-        raise HTTPException(status_code=404, detail="Álbum no encontrado")
-    return album
\ No newline at end of file
+    expansions = parse_expand(expand, ["songs"])
+    if not expansions:
+        async def load():
+            album = await db.get(Album, album_id)
+            if not album:
+                raise HTTPException(status_code=404, detail="Álbum no encontrado")
+            return AlbumOut.model_validate(album)
+
+        return await cache.respond(request, cache.item_key("albums", album_id), load)
+
+    async def load_expanded():
+        stmt = (
+            select(Album)
+            .where(Album.id == album_id)
+            .options(selectinload(Album.songs).options(
+                load_only(*[getattr(Song, name) for name in TrackOut.model_fields])
+            ))
+        )
+        album = (await db.execute(stmt)).scalar_one_or_none()
+        if not album:
+            raise HTTPException(status_code=404, detail="Álbum no encontrado")
+        return AlbumDetail.model_validate(album).model_dump(exclude_unset=True)
+
+    key = await cache.view_key("album-detail", ["albums", "songs"], album_id, *expansions)
+    return await cache.respond(request, key, load_expanded)
\ No newline at end of file
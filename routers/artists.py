@@ -1,9 +1,20 @@
 # routers/artists.py
-from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Artist
-from utils import upload_file_to_cloudinary
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile, Request, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from database import get_db, get_read_db, replicas
+from models import Artist, Album, Song, LikeCount
+from schemas import ArtistOut, ArtistDetail, ArtistAlbumOut, TopSongOut, TrackOut, Page
+from uploads import upload_media
+from cache import cache
+from search import search_index
+from autocomplete import autocomplete_index
+from pagination import PageParams, page_params, paginate, full_dump, parse_expand
+
+TOP_SONGS_LIMIT = 10
 
 router = APIRouter(
     prefix="/artists",
@@ -23,14 +34,14 @@ router = APIRouter(
     tags=["Artistas"]
 )
 
-@router.post("/")
-def create_artist(
+@router.post("/", response_model=ArtistOut)
+async def create_artist(
     name: str = Form(...),
     bio: str = Form(None),
     country: str = Form(None),
     artist_pic_file: UploadFile = File(None), # Opción 1
     artist_pic_link: str = Form(None),       # Opción 2
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crea un nuevo artista. Acepta una imagen subida o un link URL.
@@ -41,7 +52,7 @@ def create_artist(
     if artist_pic_file and artist_pic_file.filename:
         
         # Subir el archivo binario a Cloudinary
-        final_pic_url = upload_file_to_cloudinary(artist_pic_file, folder="music_app_artist_pics")
+        final_pic_url = await upload_media(artist_pic_file, "music_app_artist_pics")
         
         if not final_pic_url:
             raise HTTPException(500, "Error al subir la imagen a Cloudinary")
@@ -59,19 +70,71 @@ def create_artist(
         artist_pic=final_pic_url 
     )
     db.add(a)
-    db.commit()
-    db.refresh(a)
+    await db.commit()
+    await db.refresh(a)
+    replicas.mark_created("artist", a.id)
+    await cache.invalidate("artists")
+    search_index.add("artist", a.id, a)
+    autocomplete_index.add("artist", a.id, a.name)
     return a
 
 
 
-@router.get("/")
-def get_artists_all(db: Session = Depends(get_db)):
-    return db.query(Artist).all()
+@router.get("/", response_model=Page[ArtistOut])
+async def get_artists_all(request: Request, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
+    """
+    Lista paginada de artistas (`?cursor=&limit=&fields=`).
+    La tabla completa sólo se devuelve con `?all=true`.
+    """
+    if page.full_dump:
+        return await full_dump(db, Artist, ArtistOut, page)
+    key = await cache.list_key("artists", page.cursor, page.limit, page.fields)
+    return await cache.respond(request, key, lambda: paginate(db, Artist, ArtistOut, page))
+
+@router.get("/{artist_id}", response_model=ArtistDetail)
+async def get_artist_by_id(
+    artist_id: int,
+    request: Request,
+    expand: Optional[str] = Query(None, description="albums, songs (canciones más escuchadas por likes)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    expansions = parse_expand(expand, ["albums", "songs"])
+    if not expansions:
+        async def load():
+            artist = await db.get(Artist, artist_id)
+            if not artist:
+                raise HTTPException(status_code=404, detail="Artista no encontrado")
+            return ArtistOut.model_validate(artist)
+
+        return await cache.respond(request, cache.item_key("artists", artist_id), load)
+
+    async def load_expanded():
+        stmt = select(Artist).where(Artist.id == artist_id)
+        if "albums" in expansions:
+            stmt = stmt.options(selectinload(Artist.albums).options(
+                load_only(*[getattr(Album, name) for name in ArtistAlbumOut.model_fields])
+            ))
+        artist = (await db.execute(stmt)).scalar_one_or_none()
+        if not artist:
+            raise HTTPException(status_code=404, detail="Artista no encontrado")
+
+        detail = ArtistDetail.model_validate(ArtistOut.model_validate(artist).model_dump())
+        if "albums" in expansions:
+            detail.albums = [ArtistAlbumOut.model_validate(a) for a in artist.albums]
+        if "songs" in expansions:
+            # Top por likes: un LEFT JOIN con like_counts, sin agregar la tabla de likes
+            likes = func.coalesce(LikeCount.count, 0)
+            top = (
+                select(*[getattr(Song, name) for name in TrackOut.model_fields], Song.album_id, likes.label("likes"))
+                .outerjoin(LikeCount, (LikeCount.item_type == "song") & (LikeCount.item_id == Song.id))
+                .where(Song.artist_id == artist_id)
+                .order_by(likes.desc(), Song.id)
+                .limit(TOP_SONGS_LIMIT)
+            )
+            detail.top_songs = [TopSongOut.model_validate(dict(r)) for r in (await db.execute(top)).mappings()]
+        # Sólo las expansiones pedidas aparecen en la respuesta
+        return detail.model_dump(exclude_unset=True)
 
-@router.get("/{artist_id}")
-def get_artist_by_id(artist_id: int, db: Session = Depends(get_db)):
-    artist = db.query(Artist).get(artist_id)
-    if not artist:
-        raise HTTPException(status_code=404, detail="Artista no encontrado")
-    return artist
\ No newline at end of file
+    # Los likes no invalidan la vista: el ranking se refresca al vencer el TTL
+    key = await cache.view_key("artist-detail", ["artists", "albums", "songs"], artist_id, *expansions)
+    return await cache.respond(request, key, load_expanded)
\ No newline at end of file
@@ -0,0 +1,29 @@
+# routers/autocomplete.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from autocomplete import autocomplete_index, AUTOCOMPLETE_SOURCES, MAX_KEY_LENGTH, TOP_K
+from schemas import AutocompleteResults
+
+router = APIRouter(
+    prefix="/autocomplete",
+    tags=["Búsqueda"]
+)
+
+
+@router.get("", response_model=AutocompleteResults)
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=MAX_KEY_LENGTH),
+    types: Optional[str] = Query(None, description="song,album,artist (por defecto todos)"),
+    limit: int = Query(10, ge=1, le=TOP_K)
+):
+    """
+    Sugerencias mientras se escribe: nombres que empiezan (en cualquier palabra)
+    por el texto dado, tolerando una errata, ordenados por likes. Sin BD.
+    """
+    wanted = [t.strip() for t in types.split(",")] if types else list(AUTOCOMPLETE_SOURCES)
+    unknown = [t for t in wanted if t not in AUTOCOMPLETE_SOURCES]
+    if unknown:
+        raise HTTPException(400, f"Tipos no válidos: {', '.join(unknown)}")
+    return {"query": q, "suggestions": autocomplete_index.complete(q, limit, wanted)}
@@ -0,0 +1,55 @@
+# routers/charts.py
+# Rankings de popularidad servidos desde los contadores de like_counts.
+from typing import List, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_read_db
+from models import LikeCount, Song, Album, Artist
+from schemas import SongOut, AlbumOut, ArtistOut, SongRanked, AlbumRanked, ArtistRanked
+from pagination import select_columns
+from cache import cache
+from responses import rows_to_dicts
+
+# tipo -> (modelo, esquema de salida)
+CHARTABLE = {
+    "song": (Song, SongOut),
+    "album": (Album, AlbumOut),
+    "artist": (Artist, ArtistOut),
+}
+
+router = APIRouter(
+    prefix="/charts",
+    tags=["Rankings"]
+)
+
+
+@router.get("/top/{item_type}", response_model=List[Union[SongRanked, AlbumRanked, ArtistRanked]])
+async def get_top(
+    item_type: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Top-N de canciones, álbumes o artistas con más likes. Recorre el índice
+    (item_type, count) de like_counts, sin agregar la tabla de likes. El ranking
+    no se invalida con cada like: se sirve de la caché hasta que vence el TTL.
+    """
+    if item_type not in CHARTABLE:
+        raise HTTPException(400, "Tipo inválido")
+    model, schema = CHARTABLE[item_type]
+
+    async def load():
+        stmt = (
+            select(*select_columns(model, schema, None), LikeCount.count.label("likes"))
+            .join(model, model.id == LikeCount.item_id)
+            .where(LikeCount.item_type == item_type, LikeCount.count > 0)
+            .order_by(LikeCount.count.desc(), LikeCount.item_id)
+            .limit(limit)
+        )
+        return rows_to_dicts(await db.execute(stmt))
+
+    return await cache.respond(request, f"charts:{item_type}:{limit}", load)
@@ -0,0 +1,59 @@
+# routers/export.py
+# Exportación completa del catálogo en NDJSON (una fila JSON por línea).
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from models import Song, Album, Artist
+from schemas import SongOut, AlbumOut, ArtistOut
+from pagination import select_columns
+from responses import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# entidad -> (modelo, esquema de salida)
+EXPORTABLE = {
+    "songs": (Song, SongOut),
+    "albums": (Album, AlbumOut),
+    "artists": (Artist, ArtistOut),
+}
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Exportación"]
+)
+
+
+async def _iter_ndjson(model, columns):
+    """
+    Recorre la tabla con un cursor del lado del servidor (`yield_per`) y emite
+    cada lote en cuanto llega, así la memoria no depende del tamaño de la tabla.
+    La sesión es propia del generador porque vive mientras dura la respuesta.
+    """
+    stmt = select(*columns).order_by(model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with ReadSessionLocal() as db:
+        result = (await db.stream(stmt)).mappings()
+        async for batch in result.partitions():
+            yield b"".join(dumps(dict(row)) + b"\n" for row in batch)
+
+
+@router.get("/{entity}", response_class=StreamingResponse)
+async def export_entity(entity: str, fields: Optional[str] = Query(None)):
+    """
+    Descarga completa de `songs`, `albums` o `artists` como `application/x-ndjson`.
+    Pensado para la sincronización nocturna y la caché offline de Kotlin.
+    """
+    if entity not in EXPORTABLE:
+        raise HTTPException(404, "Entidad no exportable")
+
+    model, schema = EXPORTABLE[entity]
+    columns = select_columns(model, schema, fields)
+    return StreamingResponse(
+        _iter_ndjson(model, columns),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{entity}.ndjson"'},
+    )
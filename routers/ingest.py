@@ -0,0 +1,71 @@
+# routers/ingest.py
+# Carga masiva del catálogo por HTTP (la lógica está en ingest.py; también hay CLI)
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from database import SessionLocal, replicas
+from ingest import INGEST_BATCH_SIZE, Ingester, guess_format, read_rows
+from schemas import IngestReport
+from uploads import spool_upload, discard_spooled
+from cache import cache
+from search import search_index
+from autocomplete import autocomplete_index
+from routers.admin import require_admin_token
+
+router = APIRouter(
+    prefix="/ingest",
+    tags=["Carga masiva"],
+    dependencies=[Depends(require_admin_token)]
+)
+
+# tipo -> (namespace de la caché, campo con el nombre)
+INDEXED = {"artist": ("artists", "name"), "album": ("albums", "title"), "song": ("songs", "title")}
+
+
+def _run(catalog, fmt: str, media_paths: dict, batch_size: int):
+    def open_media(name: str):
+        path = media_paths.get(os.path.basename(name))
+        if path is None:
+            raise FileNotFoundError(f"{name} no se ha enviado en `media`")
+        return open(path, "rb")
+
+    with SessionLocal() as db:
+        ingester = Ingester(db, open_media, batch_size, collect_items=True)
+        return ingester.run(read_rows(catalog, fmt)), ingester.items
+
+
+@router.post("", response_model=IngestReport)
+async def ingest_catalog(
+    catalog: UploadFile = File(..., description="NDJSON (un objeto por línea) o CSV con cabecera"),
+    media: List[UploadFile] = File(None, description="Archivos que las filas referencian por nombre"),
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$", description="Por defecto, según la extensión"),
+    batch_size: int = Query(INGEST_BATCH_SIZE, ge=1, le=50000, description="Filas por transacción"),
+):
+    """
+    Alta masiva de artistas, álbumes y canciones (formato de las filas: ver
+    ingest.py). Las filas con errores se devuelven en el informe con su número
+    de línea y no detienen la carga.
+    """
+    # Copias propias: los medios se suben desde varios hilos a la vez
+    media_paths = {}
+    try:
+        for f in media or []:
+            if f.filename:
+                media_paths[os.path.basename(f.filename)] = await spool_upload(f)
+        report, items = await run_in_threadpool(_run, catalog.file, fmt or guess_format(catalog.filename), media_paths, batch_size)
+    finally:
+        for path in media_paths.values():
+            discard_spooled(path)
+
+    search_index.add_many(items)
+    for item_type, item_id, row in items:
+        _, name_field = INDEXED[item_type]
+        autocomplete_index.add(item_type, item_id, row[name_field])
+    for kind, n in report["created"].items():
+        if n:
+            replicas.mark_written(kind, None)
+            await cache.invalidate(INDEXED[kind][0])
+    return report
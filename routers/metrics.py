@@ -0,0 +1,23 @@
+# routers/metrics.py
+# Métricas en formato de exposición de Prometheus (texto 0.0.4).
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from routers.admin import require_admin
+from db_pool import pool_stats
+from cache import cache
+from instrumentation import render_prometheus
+
+router = APIRouter(
+    tags=["Administración"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Latencia por ruta, consultas y tiempo de BD por petición, pools y caché."""
+    return PlainTextResponse(
+        render_prometheus(pool_stats(), cache.stats()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
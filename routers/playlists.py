@@ -1,31 +1,42 @@
 # routers/playlists.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
-from sqlalchemy.orm import Session, joinedload 
-from typing import Optional, List, Union
-from pydantic import BaseModel 
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 
-from database import get_db
+from database import get_db, get_read_db, replicas
+import likes
+import playlist_edit
 
-from models import Playlist, Song, UserDB, Like, Artist, Album 
+from models import Playlist, Song, UserDB, Artist, Album, playlist_songs
+from cache import cache
+from responses import rows_to_dicts
+from autocomplete import autocomplete_index
+import recommendations
 
 from schemas import (
     PlaylistCreate, 
     PlaylistAddSong, 
+    PlaylistSongsAdd,
+    PlaylistSongsRemove,
+    PlaylistSongsMove,
     PlaylistOut,
-
-    SongOut, 
-    ArtistOut, 
-    AlbumOut
+    PlaylistDetail,
+    LikeBatch,
+    LikesGrouped,
+    MessageOut,
+    PlaylistSongsAdded,
+    PlaylistSongsRemoved,
+    PlaylistOrder,
+    LikeToggled,
+    LikeBatchResult
 ) 
 
-#kotlin
-class LikesGrouped(BaseModel):
-    songs: List[SongOut] = []
-    artists: List[ArtistOut] = []
-    albums: List[AlbumOut] = []
+PROFILE_MAX_LIMIT = 200
+PLAYLIST_MAX_LIMIT = 500
 
 router = APIRouter(
     tags=["Playlists y Likes"]
@@ -34,98 +45,181 @@ router = APIRouter(
 
 
 @router.post("/playlists", response_model=PlaylistOut)
-def create_playlist(p: PlaylistCreate, db: Session = Depends(get_db)):
-    user = db.query(UserDB).get(p.user_id)
+async def create_playlist(p: PlaylistCreate, db: AsyncSession = Depends(get_db)):
+    user = await db.get(UserDB, p.user_id)
     if not user: raise HTTPException(404, "Usuario no encontrado")
 
     pl = Playlist(name=p.name, user_id=p.user_id)
     db.add(pl)
-    db.commit()
-    db.refresh(pl)
+    await db.commit()
+    await db.refresh(pl)
+    replicas.mark_written("playlist", pl.id)
     return pl
 
-@router.post("/playlists/{playlist_id}/add_song")
-def add_song_to_playlist(playlist_id: int, p: PlaylistAddSong, db: Session = Depends(get_db)):
-    playlist = db.query(Playlist).get(playlist_id)
-    song = db.query(Song).get(p.song_id)
+async def _lock_playlist(db: AsyncSession, playlist_id: int) -> Playlist:
+    # FOR UPDATE serializa las ediciones concurrentes de una misma playlist
+    playlist = await db.get(Playlist, playlist_id, with_for_update=True)
+    if not playlist:
+        raise HTTPException(404, "Playlist no encontrada")
+    return playlist
+
+@router.post("/playlists/{playlist_id}/add_song", response_model=MessageOut)
+async def add_song_to_playlist(playlist_id: int, p: PlaylistAddSong, db: AsyncSession = Depends(get_db)):
+    await _lock_playlist(db, playlist_id)
+    song = await db.get(Song, p.song_id)
     
-    if not playlist or not song:
+    if not song:
         raise HTTPException(404, "Playlist o canción no encontrada")
         
-    if song in playlist.songs:
+    # Consulta por clave primaria (playlist_id, song_id): no se carga la colección
+    if await playlist_edit.contains(db, playlist_id, p.song_id):
         return {"message": "La canción ya estaba en la playlist"}
 
-    playlist.songs.append(song)
-    db.commit()
+    await playlist_edit.add_songs(db, playlist_id, [p.song_id])
+    await recommendations.mark_dirty(db, [p.song_id])
+    await db.commit()
+    replicas.mark_written("playlist", playlist_id)
     return {"message": "Canción agregada correctamente"}
 
-@router.get("/playlists/{playlist_id}")
-def get_playlist(playlist_id: int, db: Session = Depends(get_db)):
-    pl = db.query(Playlist).get(playlist_id)
-    if not pl: raise HTTPException(404, "Playlist no encontrada")
-    
-    songs_data = [{"id": s.id, "title": s.title, "audio": s.audio_path} for s in pl.songs]
-    return {"id": pl.id, "name": pl.name, "owner_id": pl.user_id, "songs": songs_data}
+@router.post("/playlists/{playlist_id}/songs", response_model=PlaylistSongsAdded)
+async def add_songs_to_playlist(playlist_id: int, p: PlaylistSongsAdd, db: AsyncSession = Depends(get_db)):
+    """
+    Añade varias canciones en una transacción, al final o a partir de `position`.
+    Las que no existen o ya estaban se devuelven en `ignored`.
+    """
+    await _lock_playlist(db, playlist_id)
+    added, ignored = await playlist_edit.add_songs(db, playlist_id, p.song_ids, p.position)
+    await recommendations.mark_dirty(db, added)
+    await db.commit()
+    replicas.mark_written("playlist", playlist_id)
+    return {"added": added, "ignored": ignored}
+
+@router.post("/playlists/{playlist_id}/songs/remove", response_model=PlaylistSongsRemoved)
+async def remove_songs_from_playlist(playlist_id: int, p: PlaylistSongsRemove, db: AsyncSession = Depends(get_db)):
+    await _lock_playlist(db, playlist_id)
+    removed = await playlist_edit.remove_songs(db, playlist_id, p.song_ids)
+    await recommendations.mark_dirty(db, removed)
+    await db.commit()
+    replicas.mark_written("playlist", playlist_id)
+    return {"removed": removed}
+
+@router.post("/playlists/{playlist_id}/songs/move", response_model=PlaylistOrder)
+async def move_songs_in_playlist(playlist_id: int, p: PlaylistSongsMove, db: AsyncSession = Depends(get_db)):
+    """
+    Reordena la playlist. Los movimientos se aplican en el orden recibido;
+    `position` es el índice (desde 0) que ocupará la canción.
+    """
+    await _lock_playlist(db, playlist_id)
+    order = await playlist_edit.move_songs(db, playlist_id, [(m.song_id, m.position) for m in p.moves])
+    await db.commit()
+    replicas.mark_written("playlist", playlist_id)
+    return {"song_ids": order}
+
+@router.get("/playlists/{playlist_id}", response_model=PlaylistDetail)
+async def get_playlist(
+    playlist_id: int,
+    offset: int = Query(0, ge=0, description="Posición desde la que empezar"),
+    limit: int = Query(100, ge=1, le=PLAYLIST_MAX_LIMIT),
+    include: Optional[str] = Query(None, description="artist,album para añadir sus nombres"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Página de una playlist en orden. Las posiciones son densas, así que el
+    offset es un recorrido del índice (playlist_id, position) y no un OFFSET.
+    Se leen sólo las columnas que se devuelven, con un único JOIN.
+    """
+    extras = set((include or "").split(","))
+    header = (await db.execute(
+        select(
+            Playlist.id, Playlist.name, Playlist.user_id,
+            select(func.count()).where(playlist_songs.c.playlist_id == playlist_id).scalar_subquery().label("total")
+        ).where(Playlist.id == playlist_id)
+    )).first()
+    if not header: raise HTTPException(404, "Playlist no encontrada")
+
+    columns = [Song.id, Song.title, Song.audio_path.label("audio"), playlist_songs.c.position]
+    stmt = select(*columns).select_from(playlist_songs).join(Song, Song.id == playlist_songs.c.song_id)
+    if "artist" in extras:
+        stmt = stmt.add_columns(Artist.name.label("artist_name")).outerjoin(Artist, Artist.id == Song.artist_id)
+    if "album" in extras:
+        stmt = stmt.add_columns(Album.title.label("album_title")).outerjoin(Album, Album.id == Song.album_id)
+    stmt = (
+        stmt.where(playlist_songs.c.playlist_id == playlist_id, playlist_songs.c.position >= offset)
+        .order_by(playlist_songs.c.position)
+        .limit(limit)
+    )
+    songs_data = rows_to_dicts(await db.execute(stmt))
+
+    next_offset = offset + limit if offset + limit < header.total else None
+    return {
+        "id": header.id, "name": header.name, "owner_id": header.user_id,
+        "total": header.total, "songs": songs_data, "next_offset": next_offset
+    }
 
 
 # LIKES
 
 
-@router.post("/users/{user_id}/like/{item_type}/{item_id}")
-def toggle_like(user_id: int, item_type: str, item_id: int, db: Session = Depends(get_db)):
-    if item_type not in ["artist", "album", "song"]:
+@router.post("/users/{user_id}/like/{item_type}/{item_id}", response_model=LikeToggled)
+async def toggle_like(user_id: int, item_type: str, item_id: int, db: AsyncSession = Depends(get_db)):
+    if item_type not in likes.LIKE_TYPES:
         raise HTTPException(400, "Tipo inválido")
 
-    like = db.query(Like).filter_by(user_id=user_id, item_type=item_type, item_id=item_id).first()
-
-    if like:
-        db.delete(like)
-        db.commit()
-        return {"liked": False}
-
-    new_like = Like(user_id=user_id, item_type=item_type, item_id=item_id)
-    db.add(new_like)
-    db.commit()
-    return {"liked": True}
+    # DELETE y, sólo si no había fila, INSERT: sin SELECT previo
+    liked = await likes.toggle(db, user_id, item_type, item_id)
+    if item_type == "song":
+        await recommendations.mark_dirty(db, [item_id])
+    await db.commit()
+    replicas.mark_written("user", user_id)
+    await cache.invalidate(f"user-likes:{user_id}")
+    autocomplete_index.bump(item_type, item_id, 1 if liked else -1)
+    return {"liked": liked}
+
+@router.post("/users/{user_id}/likes/batch", response_model=LikeBatchResult)
+async def batch_likes(user_id: int, batch: LikeBatch, db: AsyncSession = Depends(get_db)):
+    """
+    Aplica una ráfaga de likes/unlikes en una sola transacción. Las operaciones
+    sobre el mismo elemento se combinan (gana la última) y el resultado se escribe
+    con un INSERT multi-fila y un DELETE.
+    """
+    final = likes.coalesce((op.item_type, op.item_id, op.liked) for op in batch.operations)
+    liked, unliked, deltas = await likes.apply_batch(db, user_id, final)
+    await recommendations.mark_dirty(db, [i for t, i in liked + unliked if t == "song"])
+    await db.commit()
+    replicas.mark_written("user", user_id)
+    await cache.invalidate(f"user-likes:{user_id}")
+    for (item_type, item_id), delta in deltas.items():
+        autocomplete_index.bump(item_type, item_id, delta)
+    return {
+        "liked": [{"item_type": t, "item_id": i} for t, i in liked],
+        "unliked": [{"item_type": t, "item_id": i} for t, i in unliked],
+    }
 
 # VISTA DE PERFIL DE KOTLIN 
 
 @router.get("/users/{user_id}/likes", response_model=LikesGrouped)
-def get_user_likes(user_id: int, db: Session = Depends(get_db)):
+async def get_user_likes(
+    user_id: int,
+    request: Request,
+    limit: int = Query(50, ge=1, le=PROFILE_MAX_LIMIT, description="Elementos por grupo"),
+    songs_offset: int = Query(0, ge=0),
+    artists_offset: int = Query(0, ge=0),
+    albums_offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Obtiene todos los elementos (canciones, artistas, álbumes) que un usuario ha dado like, 
-    agrupados por tipo. Este endpoint alimenta la ProfileScreen de Kotlin.
+    Obtiene los elementos (canciones, artistas, álbumes) que un usuario ha dado like, 
+    agrupados por tipo y paginados por grupo. Este endpoint alimenta la ProfileScreen de Kotlin.
+    Se resuelve en una única consulta y se cachea por usuario hasta el siguiente like.
     """
-    # 1. Verificar si el usuario existe
-    user = db.query(UserDB).get(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-    # 2. Obtener todos los registros de Likes para este usuario
-    likes = db.query(Like).filter(Like.user_id == user_id).all()
+    offsets = {"songs": songs_offset, "artists": artists_offset, "albums": albums_offset}
 
-    # 3. Clasificar los IDs por tipo
-    liked_songs_ids = [like.item_id for like in likes if like.item_type == 'song']
-    liked_artists_ids = [like.item_id for like in likes if like.item_type == 'artist']
-    liked_albums_ids = [like.item_id for like in likes if like.item_type == 'album']
+    async def load():
+        grouped = await likes.grouped_for_user(db, user_id, limit, offsets)
+        if grouped is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        items, totals = grouped
+        return LikesGrouped(**items, totals=totals)
 
-    # 4. Obtener los detalles completos de cada elemento likeado
-
-    # Canciones: Cargamos las canciones y precargamos el artista y el álbum para evitar N+1
-    songs_details = db.query(Song).options(
-        joinedload(Song.artist), 
-        joinedload(Song.album)
-    ).filter(Song.id.in_(liked_songs_ids)).all()
-
-    # Artistas:
-    artists_details = db.query(Artist).filter(Artist.id.in_(liked_artists_ids)).all()
-
-    # Álbumes:
-    albums_details = db.query(Album).filter(Album.id.in_(liked_albums_ids)).all()
-    
-    # 5. Devolver la respuesta agrupada
-    return LikesGrouped(
-        songs=songs_details,
-        artists=artists_details,
-        albums=albums_details
-    )
\ No newline at end of file
+    key = await cache.list_key(f"user-likes:{user_id}", limit, songs_offset, artists_offset, albums_offset)
+    return await cache.respond(request, key, load)
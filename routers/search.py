@@ -0,0 +1,36 @@
+# routers/search.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_read_db
+from schemas import SearchResults
+from search import search_index, SEARCH_FIELDS
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Búsqueda"]
+)
+
+
+@router.get("", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=1),
+    types: Optional[str] = Query(None, description="song,album,artist (por defecto todos)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Búsqueda de texto mezclando canciones, álbumes y artistas, ordenada por relevancia.
+    """
+    wanted = [t.strip() for t in types.split(",")] if types else list(SEARCH_FIELDS)
+    unknown = [t for t in wanted if t not in SEARCH_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Tipos no válidos: {', '.join(unknown)}")
+
+    # Se pide uno de más para saber si hay página siguiente
+    hits = await search_index.search(db, q, wanted, limit + 1, offset)
+    next_offset = offset + limit if len(hits) > limit else None
+    return {"query": q, "results": hits[:limit], "next_offset": next_offset}
@@ -1,14 +1,31 @@
 # CANCIONES (CON CLOUDINARY) 
 # routers/songs.py
-from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile
-from sqlalchemy.orm import Session
+import logging
+import mimetypes
+
+from fastapi import APIRouter, Depends, HTTPException, File, Form, UploadFile, BackgroundTasks, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy import select, update
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 # Importaciones de módulos locales
-from database import get_db
+from database import get_db, get_read_db, replicas, AsyncSessionLocal
 from models import Song
-from schemas import SongCreate # Lo usamos como referencia para los campos
-from utils import upload_file_to_cloudinary
+from schemas import SongCreate, SongOut, SongScored, Page # Lo usamos como referencia para los campos
+from pagination import PageParams, page_params, paginate, full_dump
+from uploads import UPLOAD_MODE, upload_media, spool_upload, upload_spooled
+from cache import cache
+from search import search_index
+from autocomplete import autocomplete_index
+from audio_cache import OriginError, get_audio_cache
+import recommendations
+
+SONGS_FOLDER = "music_app_songs"
+
+logger = logging.getLogger("musicapi.uploads")
 
 # 1. Definición del Router
 router = APIRouter(
@@ -17,17 +34,62 @@ router = APIRouter(
 )
 
 
-@router.post("/songs")
-def create_song(
+async def _finish_song_upload(song_id: int, path: str, filename: str):
+    """Tarea en segundo plano del modo asíncrono: sube el audio y completa la fila."""
+    try:
+        url_audio = await run_in_threadpool(upload_spooled, path, SONGS_FOLDER, filename)
+    except Exception:
+        # Sin esto la fila se quedaría en "pending" para siempre
+        logger.exception("falló la subida en segundo plano de la canción %s", song_id)
+        url_audio = None
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Song).where(Song.id == song_id).values(
+                audio_path=url_audio,
+                upload_status="ready" if url_audio else "failed"
+            )
+        )
+        await db.commit()
+    replicas.mark_created("song", song_id)
+    await cache.invalidate("songs", song_id)
+
+
+@router.post("/songs", response_model=SongOut)
+async def create_song(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     duration: str = Form(None),
     album_id: int = Form(None),
     artist_id: int = Form(None),
     audio: UploadFile = File(...), # Archivo obligatorio
-    db: Session = Depends(get_db)
+    async_upload: bool = Form(UPLOAD_MODE == "async"),
+    db: AsyncSession = Depends(get_db)
 ):
-    # 1. Subir a Cloudinary
-    url_audio = upload_file_to_cloudinary(audio, folder="music_app_songs")
+    """
+    Crea una canción. Con `async_upload=true` la fila se crea al momento con
+    `upload_status="pending"` y el `audio_path` se rellena en segundo plano.
+    """
+    if async_upload:
+        path = await spool_upload(audio)
+        s = Song(
+            title=title, 
+            duration=duration, 
+            album_id=album_id,
+            artist_id=artist_id, 
+            upload_status="pending"
+        )
+        db.add(s)
+        await db.commit()
+        await db.refresh(s)
+        replicas.mark_created("song", s.id)
+        await cache.invalidate("songs")
+        search_index.add("song", s.id, s)
+        autocomplete_index.add("song", s.id, s.title)
+        background_tasks.add_task(_finish_song_upload, s.id, path, audio.filename)
+        return s
+
+    # 1. Subir a Cloudinary (en streaming y fuera del event loop, antes de abrir la sesión)
+    url_audio = await upload_media(audio, SONGS_FOLDER)
     
     if not url_audio:
         raise HTTPException(500, "Error al subir el archivo de audio")
@@ -41,21 +103,82 @@ def create_song(
         audio_path=url_audio
     )
     db.add(s)
-    db.commit()
-    db.refresh(s)
+    await db.commit()
+    await db.refresh(s)
+    replicas.mark_created("song", s.id)
+    await cache.invalidate("songs")
+    search_index.add("song", s.id, s)
+    autocomplete_index.add("song", s.id, s.title)
     return s
 
-@router.get("/songs")
-def get_songs(db: Session = Depends(get_db)):
-    return db.query(Song).all()
+@router.get("/songs", response_model=Page[SongOut])
+async def get_songs(request: Request, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
+    """
+    Lista paginada de canciones (`?cursor=&limit=&fields=`).
+    La tabla completa sólo se devuelve con `?all=true`.
+    """
+    if page.full_dump:
+        return await full_dump(db, Song, SongOut, page)
+    key = await cache.list_key("songs", page.cursor, page.limit, page.fields)
+    return await cache.respond(request, key, lambda: paginate(db, Song, SongOut, page))
 
 
-@router.get("/{song_id}")
-def get_song_by_id(song_id: int, db: Session = Depends(get_db)):
+@router.get("/{song_id}", response_model=SongOut)
+async def get_song_by_id(song_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Obtiene los detalles de una canción por su ID.
     """
-    song = db.query(Song).get(song_id)
-    if not song:
+    async def load():
+        song = await db.get(Song, song_id)
+        if not song:
+            raise HTTPException(status_code=404, detail="Canción no encontrada")
+        return SongOut.model_validate(song)
+
+    return await cache.respond(request, cache.item_key("songs", song_id), load)
+
+
+@router.get("/{song_id}/similar", response_model=List[SongScored])
+async def get_similar_songs(
+    song_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Canciones que suelen aparecer junto a ésta en likes y playlists. Se leen
+    de `song_similarity` (python recommendations.py build|refresh).
+    """
+    similar = await recommendations.similar_to(db, song_id, limit)
+    if not similar and await db.get(Song, song_id) is None:
+        raise HTTPException(status_code=404, detail="Canción no encontrada")
+    return similar
+
+
+@router.get("/{song_id}/stream", response_class=FileResponse)
+async def stream_song(song_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Sirve el audio de la canción desde la caché en disco (se descarga del
+    origen la primera vez). Admite Range: los reproductores piden 206 por trozos.
+    """
+    row = (await db.execute(select(Song.audio_path, Song.upload_status).where(Song.id == song_id))).first()
+    # Liberamos la conexión: la descarga del origen y el envío pueden tardar y la
+    # dependencia no se cierra hasta terminar la respuesta
+    await db.close()
+    if not row:
         raise HTTPException(status_code=404, detail="Canción no encontrada")
-    return song
\ No newline at end of file
+    if not row.audio_path or row.upload_status != "ready":
+        raise HTTPException(status_code=404, detail="El audio de la canción no está disponible")
+
+    audio_cache = get_audio_cache()
+    try:
+        key, path = await audio_cache.acquire(row.audio_path)
+    except OriginError:
+        raise HTTPException(status_code=502, detail="No se pudo obtener el audio")
+
+    media_type = mimetypes.guess_type(row.audio_path)[0] or "audio/mpeg"
+    # El archivo queda prestado hasta terminar el envío: no se expulsa a medias
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers={"Cache-Control": "public, max-age=86400"},
+        background=BackgroundTask(audio_cache.release, key),
+    )
@@ -1,13 +1,17 @@
 # routers/users.py - Versión Corregida
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 # Importaciones ABSOLUTAS (directas a los archivos de la raíz)
-from database import get_db
+from database import get_db, get_read_db, replicas
 from models import UserDB 
-from schemas import UserCreate, UserLogin, UserOut 
-from utils import get_password_hash, verify_password 
+from schemas import UserCreate, UserLogin, UserOut, Page, SongScored
+from utils import get_password_hash_async, verify_and_rehash_async 
+from pagination import PageParams, page_params, paginate, full_dump
+from responses import FastJSONResponse
+import recommendations
 
 # ... el resto del código ...
 
@@ -20,44 +24,79 @@ router = APIRouter(
 
 # USUARIOS 
 @router.post("/", response_model=UserOut)
-def create_user(p: UserCreate, db: Session = Depends(get_db)):
-    if db.query(UserDB).filter((UserDB.username == p.username) | (UserDB.email == p.email)).first():
+async def create_user(p: UserCreate, db: AsyncSession = Depends(get_db)):
+    # Primero los duplicados: así un alta repetida no ocupa el pool de bcrypt
+    existing = await db.execute(
+        select(UserDB.id).where((UserDB.username == p.username) | (UserDB.email == p.email)).limit(1)
+    )
+    if existing.first():
         raise HTTPException(status_code=400, detail="Usuario o correo ya registrado")
-    
-    # Aquí usamos la función corregida
-    hashed_password = get_password_hash(p.password) 
-    
+
+    # El hash se calcula en el pool de procesos (ver utils.py); liberamos la
+    # conexión mientras tanto, como en /login
+    await db.close()
+    hashed_password = await get_password_hash_async(p.password)
+
     new_user = UserDB(
         username=p.username, 
         email=p.email, 
         hashed_password=hashed_password
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    replicas.mark_created("user", new_user.id)
     return new_user
 
-@router.post("/login")
-def login(creds: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(UserDB).filter(UserDB.email == creds.email).first()
-    if not user or not verify_password(creds.password, user.hashed_password):
+@router.post("/login", response_model=UserOut)
+async def login(creds: UserLogin, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(UserDB).where(UserDB.email == creds.email))).scalars().first()
+    if not user:
         raise HTTPException(status_code=400, detail="Credenciales incorrectas")
+
+    # Liberamos la conexión mientras se verifica bcrypt
+    await db.close()
+    valid, new_hash = await verify_and_rehash_async(creds.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Credenciales incorrectas")
+
+    # Hash con coste obsoleto: se actualiza aprovechando que tenemos la contraseña
+    if new_hash:
+        await db.execute(update(UserDB).where(UserDB.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
     
-    return UserOut.from_orm(user)
+    return UserOut.model_validate(user)
 
-@router.get("/", response_model=List[UserOut])
-def get_users_all(db: Session = Depends(get_db)):
+@router.get("/", response_model=Page[UserOut])
+async def get_users_all(page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
     """
-    Obtiene una lista de todos los usuarios registrados.
+    Obtiene una lista paginada de los usuarios registrados.
+    Sólo se exponen los campos de UserOut; `?all=true` devuelve la lista completa.
     """
-    return db.query(UserDB).all()
+    if page.full_dump:
+        return await full_dump(db, UserDB, UserOut, page)
+    return FastJSONResponse(await paginate(db, UserDB, UserOut, page))
 
 @router.get("/{user_id}", response_model=UserOut)
-def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Obtiene los detalles de un usuario por su ID.
     """
-    user = db.query(UserDB).get(user_id)
+    user = await db.get(UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return user
\ No newline at end of file
+    return user
+
+@router.get("/{user_id}/recommendations", response_model=List[SongScored])
+async def get_recommendations(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Canciones recomendadas a partir de sus likes y playlists (vecinos
+    precalculados por recommendations.py). Sin historial: las más populares.
+    """
+    if await db.get(UserDB, user_id) is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return await recommendations.for_user(db, user_id, limit)
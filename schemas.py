@@ -1,6 +1,12 @@
 # 3. SCHEMAS (Validación de Datos)
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Generic, List, Literal, Optional, TypeVar
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+# Las listas van a un solo IN (...) / INSERT: acotadas por los límites de
+# parámetros del driver (SQLite) y para no retener locks de escritura
+MAX_BATCH_ITEMS = 500
 
 
 # (Input/Create)
@@ -35,9 +41,47 @@ class PlaylistCreate(BaseModel):
     name: str
     user_id: int
 
+# Filas de la carga masiva (ingest.py). Las referencias van por nombre
+# (`artist`, `album`) o por id; los medios son una URL o un archivo a subir.
+
+class ArtistIngest(ArtistCreate):
+    artist_pic: Optional[str] = None
+
+class AlbumIngest(AlbumCreate):
+    artist_id: Optional[int] = None
+    artist: Optional[str] = None
+    cover: Optional[str] = None
+
+class SongIngest(SongCreate):
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    audio: Optional[str] = None
+
 class PlaylistAddSong(BaseModel):
     song_id: int
 
+class PlaylistSongsAdd(BaseModel):
+    song_ids: List[int] = Field(max_length=MAX_BATCH_ITEMS)
+    position: Optional[int] = None # None = al final
+
+class PlaylistSongsRemove(BaseModel):
+    song_ids: List[int] = Field(max_length=MAX_BATCH_ITEMS)
+
+class PlaylistMove(BaseModel):
+    song_id: int
+    position: int
+
+class PlaylistSongsMove(BaseModel):
+    moves: List[PlaylistMove] = Field(max_length=MAX_BATCH_ITEMS)
+
+class LikeOperation(BaseModel):
+    item_type: Literal["artist", "album", "song"]
+    item_id: int
+    liked: bool
+
+class LikeBatch(BaseModel):
+    operations: List[LikeOperation] = Field(max_length=MAX_BATCH_ITEMS)
+
 
 # Output/Response
 
@@ -55,7 +99,47 @@ class PlaylistOut(BaseModel):
     # ya que endpoint GET la maneja manualmente como List[dict]. 
     class Config:
         from_attributes = True
+
+class PlaylistSongOut(BaseModel):
+    id: int
+    title: str
+    audio: Optional[str] = None
+    position: int
+    # Sólo con ?include=artist / ?include=album
+    artist_name: Optional[str] = None
+    album_title: Optional[str] = None
+
+class PlaylistDetail(BaseModel):
+    id: int
+    name: str
+    owner_id: Optional[int] = None
+    total: int # canciones en toda la playlist, no sólo en esta página
+    songs: List[PlaylistSongOut] = []
+    next_offset: Optional[int] = None
         
+# BÚSQUEDA
+
+class SearchHit(BaseModel):
+    type: str # "song", "album" o "artist"
+    id: int
+    title: Optional[str] = None
+    score: float
+
+class SearchResults(BaseModel):
+    query: str
+    results: List[SearchHit] = []
+    next_offset: Optional[int] = None
+
+class AutocompleteHit(BaseModel):
+    type: str
+    id: int
+    text: str
+    likes: int
+
+class AutocompleteResults(BaseModel):
+    query: str
+    suggestions: List[AutocompleteHit] = []
+
 #ENDPOINT DE LIKES 
 
 class ArtistOut(BaseModel):
@@ -86,6 +170,7 @@ class SongOut(BaseModel):
     album_id: Optional[int] = None
     artist_id: Optional[int] = None
     audio_path: Optional[str] = None 
+    upload_status: Optional[str] = None # "pending" mientras se sube el audio
     
     # Si quieres precargar el nombre del artista en el DTO de canción, 
     # necesitarías definir la relación aquí. Por simplicidad, usamos los IDs.
@@ -93,6 +178,125 @@ class SongOut(BaseModel):
     class Config:
         from_attributes = True
 
+# DETALLE EXPANDIDO (?expand=)
+
+class TrackOut(BaseModel):
+    id: int
+    title: str
+    duration: Optional[str] = None
+    audio_path: Optional[str] = None
+    upload_status: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class TopSongOut(TrackOut):
+    album_id: Optional[int] = None
+    likes: int = 0
+
+class ArtistAlbumOut(BaseModel):
+    id: int
+    title: str
+    category: str
+    cover_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class AlbumDetail(AlbumOut):
+    songs: Optional[List[TrackOut]] = None # sólo con ?expand=songs
+
+class ArtistDetail(ArtistOut):
+    albums: Optional[List[ArtistAlbumOut]] = None # ?expand=albums
+    top_songs: Optional[List[TopSongOut]] = None # ?expand=songs, por likes
+
+# LISTADOS, RANKINGS Y RESPUESTAS SIMPLES
+
+class Page(BaseModel, Generic[T]):
+    # Con ?fields= cada elemento trae sólo los campos pedidos (y siempre el id)
+    items: List[T] = []
+    next_cursor: Optional[str] = None
+
+class SongRanked(SongOut):
+    likes: int
+
+class SongScored(SongOut):
+    score: float
+
+class AlbumRanked(AlbumOut):
+    likes: int
+
+class ArtistRanked(ArtistOut):
+    likes: int
+
+class MessageOut(BaseModel):
+    message: str
+
+class PlaylistSongsAdded(BaseModel):
+    added: List[int] = []
+    ignored: List[int] = []
+
+class PlaylistSongsRemoved(BaseModel):
+    removed: List[int] = []
+
+class PlaylistOrder(BaseModel):
+    song_ids: List[int] = []
+
+class LikeRef(BaseModel):
+    item_type: str
+    item_id: int
+
+class LikeToggled(BaseModel):
+    liked: bool
+
+class LikeBatchResult(BaseModel):
+    liked: List[LikeRef] = []
+    unliked: List[LikeRef] = []
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeouts: int
+    pings: int
+    ping_failures: int
+    wait_seconds: Dict[str, Any] # histograma: buckets, sum, count
+
+class CacheStats(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+    not_modified: int
+    hit_ratio: float
+
+class StreamCacheStats(BaseModel):
+    files: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    origin_fetches: int
+
+class IngestError(BaseModel):
+    line: int
+    type: Optional[str] = None
+    error: str
+
+class IngestReport(BaseModel):
+    rows: int
+    created: Dict[str, int]
+    existing: Dict[str, int]
+    error_count: int
+    errors: List[IngestError]
+
+class ReplicaStatus(BaseModel):
+    name: str
+    healthy: bool
+    in_use: int
+    sessions: int
+    failures: int
+
 # PARA KOTLIN 
 
 class LikesGrouped(BaseModel):
@@ -100,6 +304,8 @@ class LikesGrouped(BaseModel):
     songs: List[SongOut] = []
     artists: List[ArtistOut] = []
     albums: List[AlbumOut] = []
+    # Número total de likes por grupo ("songs", "artists", "albums"), para paginar
+    totals: Dict[str, int] = {}
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,222 @@
+# search.py
+# Búsqueda de texto sobre canciones, álbumes y artistas.
+#
+# Dos backends con la misma interfaz:
+#  - FullTextSearch: índices FULLTEXT de MySQL (producción), MATCH ... AGAINST.
+#  - InvertedIndex: índice invertido en memoria para SQLite/offline, con
+#    coincidencia por prefijo y tolerancia a una errata, actualizado al crear filas.
+import heapq
+import math
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, IS_SQLITE
+from models import Song, Album, Artist
+from responses import rows_to_dicts
+
+# "auto" (FULLTEXT en MySQL, memoria en SQLite), "fulltext" o "memory"
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+SEARCH_BUILD_BATCH_SIZE = 5000
+
+# tipo -> (modelo, columna de título, [(columna, peso)])
+# Las columnas de cada tipo coinciden con su índice FULLTEXT en models.py
+SEARCH_FIELDS = {
+    "song": (Song, "title", [("title", 2.0)]),
+    "album": (Album, "title", [("title", 2.0), ("description", 1.0)]),
+    "artist": (Artist, "name", [("name", 2.0), ("bio", 1.0)]),
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    """Minúsculas, sin acentos, sólo alfanuméricos."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text).lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _WORD.findall(folded)
+
+
+def _deletes(term: str) -> Iterable[str]:
+    return (term[:i] + term[i + 1:] for i in range(len(term)))
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Distancia de edición <= 1 (sustitución, inserción, borrado o trasposición)."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if len(a) > len(b):
+        a, b = b, a
+    return any(b[:i] + b[i + 1:] == a for i in range(len(b)))
+
+
+class InvertedIndex:
+    """
+    Índice invertido en memoria. Los términos se guardan además ordenados (para
+    búsquedas por prefijo con bisect) y en un índice de borrados simétricos
+    (para encontrar términos a una errata sin recorrer todo el vocabulario).
+    """
+
+    EXACT, PREFIX, TYPO = 1.0, 0.7, 0.5
+    MAX_EXPANSIONS = 50      # términos por prefijo/errata que se consideran por palabra
+    MIN_TYPO_LENGTH = 4
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Tuple[str, int], float]] = defaultdict(dict)
+        self.titles: Dict[Tuple[str, int], str] = {}
+        self.terms: List[str] = []
+        self.deletes: Dict[str, set] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _index(self, item_type: str, item_id: int, row, new_terms: List[str]) -> None:
+        """Indexa una fila (con el lock tomado); los términos nuevos van a `new_terms`, no a self.terms."""
+        get = row.get if hasattr(row, "get") else lambda name: getattr(row, name, None)
+        _, title_field, fields = SEARCH_FIELDS[item_type]
+        key = (item_type, item_id)
+        self.titles[key] = get(title_field)
+        for field, weight in fields:
+            for term in tokenize(get(field)):
+                if term not in self.postings:
+                    new_terms.append(term)
+                    for variant in _deletes(term):
+                        self.deletes[variant].add(term)
+                posting = self.postings[term]
+                posting[key] = posting.get(key, 0.0) + weight
+
+    def add(self, item_type: str, item_id: int, row) -> None:
+        """Indexa (o re-indexa añadiendo) una fila; `row` es un objeto o un mapping."""
+        with self._lock:
+            new_terms = []
+            self._index(item_type, item_id, row, new_terms)
+            for term in new_terms:
+                insort(self.terms, term)
+
+    def add_many(self, rows: Iterable[Tuple[str, int, object]]) -> None:
+        """Carga masiva de (tipo, id, fila): los términos nuevos se ordenan una sola vez al final."""
+        with self._lock:
+            new_terms = []
+            for item_type, item_id, row in rows:
+                self._index(item_type, item_id, row, new_terms)
+            self.terms.extend(new_terms)
+            self.terms.sort()
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        expansions = {}
+        if word in self.postings:
+            expansions[word] = self.EXACT
+        start = bisect_left(self.terms, word)
+        for term in self.terms[start:start + self.MAX_EXPANSIONS]:
+            if not term.startswith(word):
+                break
+            expansions.setdefault(term, self.PREFIX)
+        if len(word) >= self.MIN_TYPO_LENGTH:
+            candidates = set(self.deletes.get(word, ()))
+            for variant in _deletes(word):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates |= self.deletes.get(variant, set())
+            for term in list(candidates)[:self.MAX_EXPANSIONS]:
+                if _within_one_edit(word, term):
+                    expansions.setdefault(term, self.TYPO)
+        return list(expansions.items())
+
+    async def search(self, db: AsyncSession, query: str, types: Sequence[str], limit: int, offset: int) -> List[dict]:
+        words = tokenize(query)
+        if not words:
+            return []
+        scores = defaultdict(float)
+        with self._lock:
+            total_docs = max(len(self.titles), 1)
+            for word in words:
+                best = {}
+                for term, factor in self._expand(word):
+                    posting = self.postings[term]
+                    idf = math.log(1 + total_docs / len(posting))
+                    for key, weight in posting.items():
+                        if key[0] in types:
+                            best[key] = max(best.get(key, 0.0), factor * idf * weight)
+                for key, score in best.items():
+                    scores[key] += score
+            top = heapq.nlargest(offset + limit, scores.items(), key=lambda kv: (kv[1], -kv[0][1]))
+            return [
+                {"type": t, "id": i, "title": self.titles.get((t, i)), "score": round(score, 4)}
+                for (t, i), score in top[offset:]
+            ]
+
+    async def build(self) -> None:
+        """Carga todo el catálogo en lotes (cursor del lado del servidor)."""
+        new_terms = []
+        for item_type, (model, _, fields) in SEARCH_FIELDS.items():
+            columns = [model.id] + [getattr(model, name) for name, _ in fields]
+            stmt = select(*columns).execution_options(yield_per=SEARCH_BUILD_BATCH_SIZE)
+            async with AsyncSessionLocal() as db:
+                result = (await db.stream(stmt)).mappings()
+                async for batch in result.partitions():
+                    with self._lock:
+                        for row in batch:
+                            self._index(item_type, row["id"], row, new_terms)
+        # insort por término haría la carga O(V²) en el tamaño del vocabulario
+        with self._lock:
+            self.terms.extend(new_terms)
+            self.terms.sort()
+
+
+class FullTextSearch:
+    """MATCH ... AGAINST en modo booleano sobre los índices FULLTEXT de MySQL."""
+
+    def add(self, item_type: str, item_id: int, row) -> None:
+        # MySQL mantiene los índices FULLTEXT al insertar
+        pass
+
+    def add_many(self, rows) -> None:
+        pass
+
+    async def build(self) -> None:
+        pass
+
+    async def search(self, db: AsyncSession, query: str, types: Sequence[str], limit: int, offset: int) -> List[dict]:
+        words = tokenize(query)
+        if not words:
+            return []
+        against = " ".join(f"{w}*" for w in words)  # prefijo en cada palabra
+        selects = []
+        for item_type in types:
+            model, title_field, fields = SEARCH_FIELDS[item_type]
+            score = mysql.match(*[getattr(model, name) for name, _ in fields], against=against).in_boolean_mode()
+            selects.append(
+                select(
+                    literal(item_type).label("type"),
+                    model.id.label("id"),
+                    getattr(model, title_field).label("title"),
+                    score.label("score"),
+                ).where(score > 0)
+            )
+        hits = union_all(*selects).subquery()
+        stmt = select(hits).order_by(hits.c.score.desc(), hits.c.id).limit(limit).offset(offset)
+        return rows_to_dicts(await db.execute(stmt))
+
+
+def _make_backend():
+    if SEARCH_BACKEND == "memory" or (SEARCH_BACKEND == "auto" and IS_SQLITE):
+        return InvertedIndex()
+    return FullTextSearch()
+
+
+search_index = _make_backend()
@@ -0,0 +1,146 @@
+# uploads.py
+# Pipeline de subida de archivos: backends intercambiables, subida fuera del
+# event loop y modo asíncrono (la fila se crea "pending" y la URL llega después).
+# Un archivo idéntico a otro ya subido no se vuelve a subir (media_assets.py).
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+
+from utils import upload_file_to_cloudinary
+import media_assets
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# "cloudinary" (producción) o "local" (sin red: copia a UPLOAD_LOCAL_DIR)
+UPLOAD_BACKEND = os.getenv("UPLOAD_BACKEND", "cloudinary")
+UPLOAD_LOCAL_DIR = os.getenv("UPLOAD_LOCAL_DIR", "./media")
+# Modo por defecto de create_song: "sync" (espera a la URL) o "async" (pending + tarea)
+UPLOAD_MODE = os.getenv("UPLOAD_MODE", "sync")
+# Reutilizar la URL de un archivo idéntico ya subido ("0" para desactivarlo)
+MEDIA_DEDUP = os.getenv("MEDIA_DEDUP", "1") == "1"
+
+logger = logging.getLogger("musicapi.uploads")
+
+
+class CloudinaryUploader:
+    def upload(self, fileobj: BinaryIO, folder: str, filename: Optional[str] = None) -> Optional[str]:
+        return upload_file_to_cloudinary(fileobj, folder=folder)
+
+
+class LocalUploader:
+    """Guarda los archivos en un directorio local. Útil offline y en pruebas."""
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+
+    def upload(self, fileobj: BinaryIO, folder: str, filename: Optional[str] = None) -> Optional[str]:
+        target_dir = os.path.join(self.directory, folder)
+        os.makedirs(target_dir, exist_ok=True)
+        name = os.path.basename(filename or "upload")
+        fd, path = tempfile.mkstemp(dir=target_dir, prefix="", suffix=f"_{name}")
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fileobj, out, SPOOL_CHUNK_SIZE)
+        return f"file://{path}"
+
+
+_uploader = None
+
+
+def get_uploader():
+    global _uploader
+    if _uploader is None:
+        _uploader = LocalUploader(UPLOAD_LOCAL_DIR) if UPLOAD_BACKEND == "local" else CloudinaryUploader()
+    return _uploader
+
+
+def set_uploader(uploader) -> None:
+    """Sustituye el backend de subida (p. ej. un LocalUploader en pruebas)."""
+    global _uploader
+    _uploader = uploader
+
+
+def upload_fileobj(fileobj: BinaryIO, folder: str, filename: Optional[str] = None,
+                   digest: Optional[str] = None, size: int = 0, register: bool = True) -> Optional[str]:
+    """
+    Sube el archivo salvo que media_assets ya tenga uno con el mismo sha256, en
+    cuyo caso devuelve esa URL sin transferir nada. Si no se da `digest`, se
+    calcula leyendo el archivo antes de subirlo. Con register=False el llamador
+    registra la subida en su propia transacción (ver ingest.py).
+    """
+    if not MEDIA_DEDUP:
+        return get_uploader().upload(fileobj, folder, filename)
+    if digest is None:
+        digest, size = media_assets.content_hash(fileobj)
+    try:
+        url = media_assets.lookup(digest)
+    except SQLAlchemyError as e:
+        # Sin registro se sube igual, como si el archivo fuera nuevo
+        logger.warning("no se pudo consultar media_assets: %s", e)
+        url = None
+    if url:
+        return url
+    url = get_uploader().upload(fileobj, folder, filename)
+    if url and register:
+        try:
+            media_assets.register(digest, url, size)
+        except SQLAlchemyError as e:
+            # El archivo ya está subido: sin registro sólo se pierde la deduplicación
+            logger.warning("no se pudo registrar %s en media_assets: %s", url, e)
+    return url
+
+
+async def upload_media(file: UploadFile, folder: str) -> Optional[str]:
+    """Sube un UploadFile en streaming desde un hilo del threadpool."""
+    return await run_in_threadpool(upload_fileobj, file.file, folder, file.filename)
+
+
+# ruta del temporal -> (sha256, tamaño), calculados al copiarlo
+_spooled_hashes = {}
+_spooled_lock = threading.Lock()
+
+
+def _spool_sync(source: BinaryIO, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="musicapi_upload_", suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        writer = media_assets.HashingWriter(out)
+        shutil.copyfileobj(source, writer, SPOOL_CHUNK_SIZE)
+    with _spooled_lock:
+        _spooled_hashes[path] = (writer.hexdigest(), writer.size)
+    return path
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """
+    Copia el UploadFile a un temporal propio. FastAPI cierra el UploadFile al
+    terminar la petición, así que la tarea en segundo plano sube desde esta copia.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    return await run_in_threadpool(_spool_sync, file.file, suffix)
+
+
+def discard_spooled(path: str) -> None:
+    """Borra un temporal de spool_upload."""
+    with _spooled_lock:
+        _spooled_hashes.pop(path, None)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def upload_spooled(path: str, folder: str, filename: Optional[str] = None) -> Optional[str]:
+    """Sube un temporal creado por spool_upload y lo borra."""
+    with _spooled_lock:
+        digest, size = _spooled_hashes.get(path, (None, 0))
+    try:
+        with open(path, "rb") as f:
+            return upload_fileobj(f, folder, filename, digest, size)
+    finally:
+        discard_spooled(path)
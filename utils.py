@@ -1,9 +1,13 @@
 # utils.py
 import os
+import asyncio
+import multiprocessing
+from typing import BinaryIO, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
 import cloudinary
 import cloudinary.uploader
 from passlib.context import CryptContext
-from fastapi import UploadFile
+from fastapi import UploadFile, HTTPException
 
 
 #4. FUNCIONES DE UTILIDAD
@@ -18,7 +22,11 @@ cloudinary.config(
   secure = True
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Coste de bcrypt (log2 de las rondas). Al subirlo, los hashes antiguos se
+# re-generan de forma transparente en el siguiente login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def get_password_hash(password: str) -> str:
     """Crea el hash de la contraseña (truncando a 72 caracteres)."""
@@ -31,11 +39,74 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     safe_password = plain_password[:72] 
     return pwd_context.verify(safe_password, hashed_password)
 
-def upload_file_to_cloudinary(file: UploadFile, folder: str = "music_app") -> str:
+def verify_and_rehash(plain_password: str, hashed_password: str):
+    """
+    Verifica la contraseña y, si el hash usa un coste o esquema obsoleto
+    (`pwd_context.needs_update`), devuelve también el hash nuevo.
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+
+# POOL DE HASHING
+# bcrypt es CPU puro: se ejecuta en procesos aparte (sin GIL) con una cola acotada.
+# Si hay demasiadas operaciones esperando respondemos 503 en vez de acumular latencia.
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+
+_hash_pool = None
+_hash_slots = None
+
+
+def _get_hash_pool():
+    global _hash_pool, _hash_slots
+    if _hash_pool is None:
+        # forkserver y no fork: el proceso de la API ya tiene hilos (aiosqlite, threadpool)
+        # y un hijo creado con fork puede heredar un lock tomado por uno de ellos
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        _hash_slots = asyncio.Semaphore(HASH_MAX_PENDING)
+    return _hash_pool, _hash_slots
+
+
+async def _run_hashing(fn, *args):
+    pool, slots = _get_hash_pool()
+    if slots.locked():
+        raise HTTPException(status_code=503, detail="Servidor ocupado, inténtalo de nuevo")
+    async with slots:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+
+async def verify_and_rehash_async(plain_password: str, hashed_password: str):
+    return await _run_hashing(verify_and_rehash, plain_password, hashed_password)
+
+
+def shutdown_hash_pool():
+    global _hash_pool, _hash_slots
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = _hash_slots = None
+
+
+# Tamaño de cada trozo en la subida por partes (upload_large)
+CLOUDINARY_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(6 * 1024 * 1024)))
+
+def upload_file_to_cloudinary(file: Union[UploadFile, BinaryIO], folder: str = "music_app") -> Optional[str]:
     """Sube archivo a Cloudinary y devuelve la URL"""
     try:
+        # Subida por partes: el archivo se lee y envía en trozos, nunca entero en memoria.
         # resource_type="auto" detecta si es audio, video o imagen
-        result = cloudinary.uploader.upload(file.file, resource_type="auto", folder=folder)
+        source = getattr(file, "file", file)
+        result = cloudinary.uploader.upload_large(
+            source, resource_type="auto", folder=folder, chunk_size=CLOUDINARY_CHUNK_SIZE
+        )
         return result.get("secure_url")
     except Exception as e:
         print(f"Error subiendo a Cloudinary: {e}")